@@ -0,0 +1,3 @@
+# ==============================
+# AudioVisualizer 内部モジュール
+# ==============================
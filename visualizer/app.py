@@ -0,0 +1,334 @@
+# ==============================
+# ライブビジュアライザー本体
+# ==============================
+#
+# import しただけでは何も起きない（デバイス列挙・pygame 初期化・ストリーム開始は
+# すべて main() の中）。pygame / sounddevice も main() で初めて読み込む。
+
+import argparse
+import time
+
+import numpy as np
+
+from visualizer.filterbank import SCALE_NAMES
+from visualizer.idle import IdleMonitor
+from visualizer.mixing import MIX_PRESETS
+from visualizer.multires import PYRAMID_RESOLUTIONS, RESOLUTIONS, MultiResolutionAnalyzer, MultiResolutionSTFT
+from visualizer.perf import FrameProfiler, PerfDumper, PerfHUD
+from visualizer.ringbuffer import RingBuffer
+from visualizer.settings import BAR_HEIGHT, BLOCK_SIZE, FPS, HOP_SIZE, N_BARS, RING_SIZE, VISUALIZER_HEIGHT
+from visualizer.sources import DEFAULT_DEVICE_BLOCK, DEFAULT_DEVICE_LATENCY, open_source
+from visualizer.spectrum import SpectrumAnalyzer
+from visualizer.stft import StreamingSTFT
+from visualizer.telemetry import CaptureTelemetry
+from visualizer.window import BACKENDS, open_backend
+from visualizer.worker import AnalysisWorker
+
+# 起動時間の計測用（モジュール読み込み時点）
+IMPORTED_AT = time.perf_counter()
+
+# 入力が途切れている間（デバイスの再接続中）にバーを下ろす割合（フレームごと）
+DISCONNECTED_DECAY = 0.9
+
+# ==============================
+# 起動オプション
+# ==============================
+
+def latency_arg(value):
+    # "low" / "high" / 秒
+    if value in ("low", "high"):
+        return value
+    return float(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Audio Visualizer")
+    parser.add_argument(
+        "--source", default="device",
+        help="device[:name] | wav:PATH | synth:tone|sweep|noise|silence | stdin[:float32|int16]"
+    )
+    parser.add_argument("--sr", type=int, default=48000, help="synth / stdin のサンプルレート")
+    parser.add_argument("--channels", type=int, default=2, help="synth / stdin のチャンネル数")
+    parser.add_argument("--device-channels", type=int, help="デバイスを開くチャンネル数（省略時はデバイス本来の数）")
+    parser.add_argument(
+        "--mix",
+        help=f"チャンネルのミキシング（{' / '.join(MIX_PRESETS)} / ch:2,3 / avg:2,3 / w:0.5,0.5;1,0）"
+    )
+    parser.add_argument(
+        "--capture-block", type=int, default=DEFAULT_DEVICE_BLOCK, metavar="FRAMES",
+        help="入力のブロック長（0 はホスト API 任せ）。解析窓の長さとは別"
+    )
+    parser.add_argument(
+        "--latency", type=latency_arg, default=DEFAULT_DEVICE_LATENCY,
+        help="デバイスの入力遅延（low / high / 秒）"
+    )
+    parser.add_argument("--channel", type=int, default=0, help="バーに表示するミキシング後のチャンネル")
+    parser.add_argument(
+        "--stereo", choices=("mirror", "updown"),
+        help="左右を別々に解析して鏡像に描く（mirror: 左右に、updown: 上下に。既定のミキシングは lr）"
+    )
+    parser.add_argument("--unthrottled", action="store_true", help="実時間を待たずに流し込む")
+    parser.add_argument("--hud", action="store_true", help="フレーム時間の HUD を表示（F3 で切替）")
+    parser.add_argument("--perf-dump", type=float, default=0, metavar="SEC", help="計測結果を SEC 秒ごとに出力")
+    parser.add_argument(
+        "--multires", nargs="?", const="fft", choices=("fft", "pyramid"),
+        help="低域は長い窓・高域は短い窓で解析する（pyramid: 最低域を間引いた信号の短い FFT で解析）"
+    )
+    parser.add_argument("--scale", choices=SCALE_NAMES, help="三角フィルタバンクの尺度（省略時は矩形バンド）")
+    parser.add_argument("--no-idle", action="store_true", help="無音でもアイドルモードに入らない")
+    parser.add_argument(
+        "--window", choices=("auto",) + tuple(BACKENDS), default="auto",
+        help="ウィンドウの種類（auto: Windows は win32、画面があれば sdl、無ければ none）"
+    )
+    parser.add_argument("--exit-after-frames", type=int, default=0, metavar="N", help="N フレーム描いたら終了（起動時間の計測用）")
+    args = parser.parse_args(argv)
+
+    if args.stereo and args.multires:
+        parser.error("--stereo cannot be combined with --multires")
+    return args
+
+# ==============================
+# 解析
+# ==============================
+
+def start_analysis(ring, sr, args, timer=None, idle=None, telemetry=None, prev=None):
+    # STFT・解析器・解析スレッドを作って開始する（デバイスを再接続したら作り直す）
+    # --stereo なら 2 チャンネルのリングの窓を 1 回の rfft でまとめて解析する
+    # prev: 時間スムージングの初期値（省略時は 0）
+    if args.multires:
+        resolutions = PYRAMID_RESOLUTIONS if args.multires == "pyramid" else RESOLUTIONS
+        stft = MultiResolutionSTFT(ring, resolutions)
+        analyzer = MultiResolutionAnalyzer(sr, N_BARS, resolutions, args.scale)
+    else:
+        stft = StreamingSTFT(ring, BLOCK_SIZE, HOP_SIZE)
+        analyzer = SpectrumAnalyzer(sr, N_BARS, args.scale, channels=2 if args.stereo else 1)
+
+    if prev is not None:
+        analyzer.prev_bar_heights[...] = prev
+
+    worker = AnalysisWorker(stft, analyzer, timer=timer, idle=idle, telemetry=telemetry)
+    worker.start()
+    return worker
+
+# ==============================
+# メイン
+# ==============================
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import pygame
+
+    from visualizer.render import BarRasterizer, PeakNormalizer, StereoBars
+
+    # ★ 必要なサブシステム（display）だけ 1 回初期化する（mixer などは開かない）
+    window = open_backend(args.window)
+    screen = window.open(VISUALIZER_HEIGHT)
+
+    # ==============================
+    # ビジュアライザー設定
+    # ==============================
+
+    bar_width = screen.get_width() // N_BARS
+
+    bar_heights = np.zeros((2, N_BARS) if args.stereo else N_BARS)
+
+    clock = pygame.time.Clock()
+
+    normalize = PeakNormalizer()
+    if args.stereo:
+        raster = StereoBars(screen, N_BARS, args.stereo, BAR_HEIGHT)
+    else:
+        raster = BarRasterizer(screen, N_BARS, bar_width, BAR_HEIGHT)
+
+    # ==== 計測 ====
+    profiler = FrameProfiler()
+    hud = PerfHUD(profiler)
+    hud.visible = args.hud
+    dumper = PerfDumper(profiler, args.perf_dump) if args.perf_dump > 0 else None
+
+    # ==============================
+    # オーディオ入力
+    # ==============================
+
+    source = open_source(
+        args.source,
+        block_size=args.capture_block,
+        realtime=not args.unthrottled,
+        sr=args.sr,
+        channels=args.channels,
+        device_channels=args.device_channels,
+        latency=args.latency
+    )
+    if args.mix or args.stereo:
+        source.set_mix(args.mix or "lr")
+    if args.stereo and source.out_channels != 2:
+        raise SystemExit(f"--stereo needs a 2-channel mix (got {source.out_channels})")
+    if not args.stereo and not 0 <= args.channel < source.out_channels:
+        raise SystemExit(f"--channel {args.channel} out of range (mix has {source.out_channels} ch)")
+
+    print(f"[Audio Capture] {getattr(source, 'name', args.source)}")
+    print("Using channels:", source.channels)
+    if source.mix_spec:
+        print(f"Mix: {source.mix_spec} -> {source.out_channels} ch")
+
+    # リングはミキシング後のチャンネル数で持ち、表示するチャンネルだけを解析する（--stereo は両方）
+    ring = RingBuffer(RING_SIZE, channels=source.out_channels)
+    view = ring if args.stereo else ring.channel(args.channel)
+
+    source.callback_timer = profiler["callback"]
+    source.telemetry = telemetry = CaptureTelemetry()
+    profiler.capture = telemetry
+    source.start(ring)
+
+    # ==============================
+    # 解析スレッド
+    # ==============================
+
+    idle = None if args.no_idle else IdleMonitor(view, source.sr)
+    profiler.idle = idle
+
+    worker = start_analysis(view, source.sr, args, profiler["analysis"], idle, telemetry)
+
+    # ==============================
+    # メインループ
+    # ==============================
+
+    pygame.event.clear()  # ★ 初期イベント破棄（KeyError対策）
+
+    perf_counter_ns = time.perf_counter_ns
+    t_events = profiler["events"]
+    t_draw = profiler["draw"]
+    t_present = profiler["present"]
+    t_tick = profiler["tick"]
+    t_latency = profiler["latency"]
+    shown_seq = 0
+    reconnects = 0
+
+    running = True
+    while running:
+        t0 = perf_counter_ns()
+
+        try:
+            events = pygame.event.get()
+        except Exception:
+            continue
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                raster.invalidate()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                hud_area = hud.area()
+                if hud_area is not None:
+                    raster.invalidate(hud_area)
+                hud.toggle()
+
+            if event.type == pygame.ACTIVEEVENT:
+                try:
+                    if event.state == 2 and event.gain == 0:
+                        window.keep_topmost()
+                except Exception:
+                    pass
+
+        # 無音が続きバーも下がりきったら、描画も画面更新もせずに音を待つ
+        if idle is not None:
+            idle.set_idle(not idle.sound and raster.at_rest)
+            if idle.idle:
+                idle.wait()
+                if dumper is not None:
+                    dumper.poll()
+                continue
+
+        # デバイスを再接続したら解析を作り直す。途絶前のフレームとスムージングの状態は捨て、
+        # 途絶中に下ろした高さから続ける（SR が変わっていればプランも新しい SR で作られる）
+        if source.connected and getattr(source, "reconnects", 0) != reconnects:
+            reconnects = source.reconnects
+            rebuilt = source.sr != worker.analyzer.sr
+            worker.stop()
+            if idle is not None:
+                idle.set_sr(source.sr)
+            worker = start_analysis(view, source.sr, args, profiler["analysis"], idle, telemetry, bar_heights)
+            shown_seq = 0
+            if rebuilt:
+                print(f"[Capture] analysis rebuilt for {source.sr} Hz")
+
+        t1 = perf_counter_ns()
+
+        seq = shown_seq
+        if source.connected:
+            # 解析スレッドが出した最新フレームだけを読む（新しいフレームが無ければ前回の高さのまま。
+            # 作り直した直後でまだ 1 つも出ていなければ読まない）
+            if worker.slot.seq:
+                seq = worker.slot.read(bar_heights)
+        else:
+            # 再接続を待つ間も描画は続け、バーを下ろしていく
+            bar_heights *= DISCONNECTED_DECAY
+
+        display_heights = normalize(bar_heights)
+
+        # 変化したバーの範囲だけ画面へ送る
+        dirty = raster.draw(display_heights)
+
+        # HUD はバーの上に重ねるので、下のバーは次のフレームで描き直させる
+        hud_rect = hud.draw(screen)
+        if hud_rect is not None:
+            dirty.append(hud_rect)
+            raster.invalidate(hud_rect)
+
+        t2 = perf_counter_ns()
+
+        if dirty:
+            pygame.display.update(dirty)
+
+        t3 = perf_counter_ns()
+
+        # 新しいフレームを初めて出した時だけ、取り込みからの遅延を記録する
+        if seq != shown_seq:
+            shown_seq = seq
+            if worker.slot.stamp:
+                t_latency.record(int((time.perf_counter() - worker.slot.stamp) * 1e9))
+
+        if profiler.frames == 0:
+            print(f"[Startup] first frame {(time.perf_counter() - IMPORTED_AT) * 1000:.0f} ms after import", flush=True)
+
+        clock.tick(FPS)
+
+        t4 = perf_counter_ns()
+
+        t_events.record(t1 - t0)
+        t_draw.record(t2 - t1)
+        t_present.record(t3 - t2)
+        t_tick.record(t4 - t3)
+        profiler.frames += 1
+
+        if dumper is not None:
+            dumper.poll()
+
+        if args.exit_after_frames and profiler.frames >= args.exit_after_frames:
+            running = False
+
+    # ==============================
+    # 終了
+    # ==============================
+
+    worker.stop()
+    source.stop()
+    pygame.quit()
+
+    if idle is not None:
+        print(f"[Idle] {idle.format_line()}")
+    print(f"[Telemetry] {telemetry.format_line()}")
+    latency = t_latency.percentiles()
+    if latency is not None:
+        p50, p95, p99 = latency / 1e3
+        print(f"[Latency] capture to present p50 {p50:.1f} / p95 {p95:.1f} / p99 {p99:.1f} ms")
+    if getattr(source, "reconnects", 0):
+        print(f"[Capture] reconnected {source.reconnects} times")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,605 @@
+# ==============================
+# ヘッドレスベンチマーク
+# ==============================
+#
+# 合成信号で解析 → 正規化 → 描画 → 画面更新 を回し、構成ごとに
+# fps・段ごとの µs・1 フレームあたりの一時確保量を JSON で出す。
+# SDL_VIDEODRIVER=dummy で動くのでオーディオ機器も画面も不要（Linux CI 可）。
+#
+#   python -m visualizer.bench                          既定値の周りを 1 軸ずつ掃引
+#   python -m visualizer.bench --full                   全組み合わせ
+#   python -m visualizer.bench --save-baseline base.json
+#   python -m visualizer.bench --baseline base.json     退行があれば終了コード 1
+#   python -m visualizer.bench --startup 5              起動 → 最初のフレームまでの時間だけ測る
+#   python -m visualizer.bench --alloc-check            解析経路の毎フレーム確保が 0 か検査（違反で 1）
+#   python -m visualizer.bench --level-check            多重解像度の各帯域が通常の解析と同じ値か検査（違反で 1）
+#   python -m visualizer.bench --capture-sweep          入力のブロック長ごとの遅延と CPU を実時間で測る
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+import numpy as np
+
+from visualizer.gradient import GradientLUT
+from visualizer.mixing import mix_matrix
+from visualizer.multires import PYRAMID_RESOLUTIONS, RESOLUTIONS, MultiResolutionAnalyzer, MultiResolutionSTFT
+from visualizer.perf import StageTimer
+from visualizer.render import BarRasterizer, PeakNormalizer
+from visualizer.ringbuffer import RingBuffer
+from visualizer.settings import BAR_HEIGHT, BLOCK_SIZE, FPS, HOP_SIZE, N_BARS, RING_SIZE, VISUALIZER_HEIGHT
+from visualizer.sources import SyntheticSource
+from visualizer.spectrum import SpectrumAnalyzer, get_plan
+from visualizer.stft import StreamingSTFT
+from visualizer.telemetry import CaptureTelemetry
+from visualizer.worker import AnalysisWorker, FrameSlot
+
+DEFAULT_CONFIG = {
+    "block_size": BLOCK_SIZE,
+    "n_bars": N_BARS,
+    "width": 1920,
+    "style": "default",
+}
+
+SWEEP = {
+    "block_size": (1024, 2048, 4096, 8192, 16384),
+    "n_bars": (32, 64, 128, 256, 512, 1024),
+    "width": (1280, 1920, 2560, 3840),
+    "style": ("default", "multistop", "per-bar"),
+}
+
+STAGES = ("analysis", "normalize", "draw", "present")
+
+# BarRasterizer は各バーの右 2 列を隙間にするので、これより細いバーは何も描かれない
+# （画面幅が足りない構成は、この幅になるよう画面を広げて測る）
+MIN_BAR_WIDTH = 3
+
+BENCH_FRAMES = 240
+WARMUP_FRAMES = 30
+ALLOC_FRAMES = 30
+TOLERANCE = 0.2
+
+# 確保検査の構成（解析方式 × 周波数尺度）とフレーム数
+ALLOC_CHECK_MODES = ("fft", "multires", "pyramid", "stereo")
+ALLOC_CHECK_SCALES = (None, "mel")
+ALLOC_CHECK_FRAMES = 500
+ALLOC_CHECK_WARMUP = 300   # カウンタ類が小さな int のキャッシュ（256 まで）を抜けるまで回す
+
+# 多重解像度のレベル検査（純音の周波数・信号の秒数・許容差 dB）
+LEVEL_CHECK_MODES = ("multires", "pyramid")
+LEVEL_CHECK_TONES = (50, 80, 150, 250, 400, 1000, 3000, 8000, 15000)
+LEVEL_CHECK_SECONDS = 2.0
+LEVEL_CHECK_TOLERANCE = 2.5
+
+# 入力のブロック長の掃引（構成ごとに実時間で CAPTURE_SWEEP_SECONDS 秒回す）
+CAPTURE_SWEEP_BLOCKS = (64, 128, 256, 512, 1024, 2048, 4096)
+CAPTURE_SWEEP_SECONDS = 5.0
+
+# 起動時間の計測に使うコマンド（合成信号で 1 フレーム描いて終了）
+STARTUP_CMD = ("-m", "visualizer.app", "--source", "synth:tone", "--exit-after-frames", "1")
+STARTUP_MARKER = "[Startup]"
+
+
+def make_gradient(style, n_bars):
+    if style == "default":
+        return GradientLUT()
+    if style == "multistop":
+        return GradientLUT(stops=[(0, (40, 60, 200)), (0.4, (80, 220, 200)), (1, (255, 120, 160))])
+    if style == "per-bar":
+        return GradientLUT(stops_high=[(255, 220, 120), (255, 80, 80)], n_bars=n_bars)
+    raise ValueError(f"unknown style: {style}")
+
+
+def config_key(cfg):
+    return ",".join(f"{k}={cfg[k]}" for k in DEFAULT_CONFIG)
+
+
+def surface_width(cfg):
+    # 実際に開く画面の幅（バーが細すぎて何も描かれない構成は広げる）
+    return max(cfg["width"], cfg["n_bars"] * MIN_BAR_WIDTH)
+
+
+def sweep_configs(full=False):
+    if full:
+        keys = list(SWEEP)
+        return [dict(zip(keys, values)) for values in product(*(SWEEP[k] for k in keys))]
+
+    # 既定値から 1 軸だけ動かした構成（重複は除く）
+    configs = [dict(DEFAULT_CONFIG)]
+    for key, values in SWEEP.items():
+        for v in values:
+            if v != DEFAULT_CONFIG[key]:
+                configs.append(dict(DEFAULT_CONFIG, **{key: v}))
+    return configs
+
+# ==============================
+# 計測
+# ==============================
+
+class Pipeline:
+    # ライブのメインループと同じ段構成を 1 フレームずつ回す
+
+    def __init__(self, cfg, sr=48000):
+        import pygame
+
+        self.hop = min(HOP_SIZE, cfg["block_size"])
+        self.ring = RingBuffer(cfg["block_size"] * 8)
+        self.stft = StreamingSTFT(self.ring, cfg["block_size"], self.hop)
+        self.analyzer = SpectrumAnalyzer(sr, cfg["n_bars"], hop=self.hop)
+
+        self.width = surface_width(cfg)
+        self.screen = pygame.display.set_mode((self.width, VISUALIZER_HEIGHT))
+        bar_width = self.width // cfg["n_bars"]
+        self.raster = BarRasterizer(
+            self.screen, cfg["n_bars"], bar_width, BAR_HEIGHT,
+            make_gradient(cfg["style"], cfg["n_bars"])
+        )
+        self.normalize = PeakNormalizer()
+        self.bar_heights = np.zeros(cfg["n_bars"])
+
+        # スイープ + ノイズ（バーが毎フレーム動くように）
+        sweep = SyntheticSource("sweep", sr, 2, self.hop, realtime=False, sweep_period=4.0)
+        noise = SyntheticSource("noise", sr, 2, self.hop, realtime=False, amplitude=0.05)
+        self._blocks = ((a + b) for a, b in zip(sweep.blocks(), noise.blocks()))
+
+        self.timings = {stage: [] for stage in STAGES}
+
+    def frame(self, record=True):
+        import pygame
+
+        self.ring.write(next(self._blocks))
+
+        t0 = time.perf_counter_ns()
+        for window in self.stft.frames():
+            self.bar_heights = self.analyzer.analyze(window)
+        t1 = time.perf_counter_ns()
+        display_heights = self.normalize(self.bar_heights)
+        t2 = time.perf_counter_ns()
+        dirty = self.raster.draw(display_heights)
+        t3 = time.perf_counter_ns()
+        if dirty:
+            pygame.display.update(dirty)
+        t4 = time.perf_counter_ns()
+
+        if record:
+            for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                self.timings[stage].append(dt)
+
+
+def run_config(cfg, frames=BENCH_FRAMES, warmup=WARMUP_FRAMES, alloc_frames=ALLOC_FRAMES):
+    pipe = Pipeline(cfg)
+
+    for _ in range(warmup):
+        pipe.frame(record=False)
+
+    for _ in range(frames):
+        pipe.frame()
+
+    # 合成信号の生成は含めず、段の合計時間から fps を出す
+    elapsed = sum(sum(ns) for ns in pipe.timings.values()) / 1e9
+
+    # 一時確保量：フレームごとに peak をリセットし、開始時点からの増分を取る
+    tracemalloc.start()
+    peaks = []
+    for _ in range(alloc_frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        pipe.frame(record=False)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "config": cfg,
+        "surface_width": pipe.width,
+        "fps": frames / elapsed,
+        "stage_us": {
+            stage: {
+                "p50": float(np.percentile(ns, 50) / 1e3),
+                "p95": float(np.percentile(ns, 95) / 1e3),
+            }
+            for stage, ns in pipe.timings.items()
+        },
+        "alloc_kib_per_frame": float(np.mean(peaks) / 1024),
+    }
+
+# ==============================
+# 確保検査（解析経路）
+# ==============================
+#
+# リング書き込み → STFT → 解析 → FrameSlot → 正規化 を回し、暖機後の
+# tracemalloc の確保量が増えないこと（正味 0 バイト）と GC が 1 度も走らないことを確かめる。
+# 1 フレーム内の一時確保の最大値（peak）も出すが、合否には使わない。
+# 描画（BarRasterizer）は対象外。
+
+class AnalysisPath:
+
+    def __init__(self, mode, scale, sr=48000, n_bars=N_BARS):
+        # stereo: L/R を 2 チャンネルのリングへ書き、まとめて解析する
+        channels = 2 if mode == "stereo" else 1
+        self.ring = RingBuffer(RESOLUTIONS[0][0] * 2, channels=channels)
+        self._mix = mix_matrix("lr", 2) if channels > 1 else None
+        if mode in ("fft", "stereo"):
+            self.stft = StreamingSTFT(self.ring, BLOCK_SIZE, HOP_SIZE)
+            self.analyzer = SpectrumAnalyzer(sr, n_bars, scale, channels)
+        else:
+            resolutions = PYRAMID_RESOLUTIONS if mode == "pyramid" else RESOLUTIONS
+            self.stft = MultiResolutionSTFT(self.ring, resolutions)
+            self.analyzer = MultiResolutionAnalyzer(sr, n_bars, resolutions, scale)
+
+        self.slot = FrameSlot(self.analyzer.prev_bar_heights.shape)
+        self.normalize = PeakNormalizer()
+        self.bar_heights = np.zeros(self.analyzer.prev_bar_heights.shape)
+
+        # 入力は前もって作っておく（信号の生成は計測に含めない）
+        source = SyntheticSource("sweep", sr, 2, self.stft.hop_size, realtime=False, sweep_period=4.0)
+        gen = source.blocks()
+        self._blocks = [next(gen) for _ in range(64)]
+        self._i = 0
+
+    def frame(self):
+        self.ring.write(self._blocks[self._i], self._mix)
+        self._i = (self._i + 1) % len(self._blocks)
+
+        for window in self.stft.frames():
+            self.slot.publish(self.analyzer.analyze(window))
+        self.slot.read(self.bar_heights)
+        self.normalize(self.bar_heights)
+
+
+def check_allocations(mode, scale, frames=ALLOC_CHECK_FRAMES, warmup=ALLOC_CHECK_WARMUP):
+    path = AnalysisPath(mode, scale)
+
+    gc_runs = []
+
+    def on_gc(phase, info):
+        if phase == "start":
+            gc_runs.append(info["generation"])
+
+    # 暖機も計測中に行う（暖機で作られた配列が後から解放されても差分に出ないように）
+    tracemalloc.start()
+    for _ in range(warmup):
+        path.frame()
+
+    # フレームごとの (確保量, 一時確保の最大) は配列に書く（計測側の int を残さない）
+    traced = np.zeros((frames, 2), dtype=np.int64)
+    gc.callbacks.append(on_gc)
+    for row in traced:
+        tracemalloc.reset_peak()
+        path.frame()
+        row[:] = tracemalloc.get_traced_memory()
+    gc.callbacks.remove(on_gc)
+    tracemalloc.stop()
+
+    # 前半と後半の確保量の最大を比べる（hop の周期で上下する分は打ち消し合う）
+    half = frames // 2
+    net = int(traced[half:, 0].max() - traced[:half, 0].max())
+    peak = int((traced[1:, 1] - traced[:-1, 0]).max())
+    return {
+        "mode": mode,
+        "scale": scale or "bands",
+        "frames": frames,
+        "net_bytes": net,
+        "peak_bytes": peak,
+        "gc_runs": len(gc_runs),
+        "ok": net <= 0 and not gc_runs,
+    }
+
+# ==============================
+# レベル検査（多重解像度）
+# ==============================
+#
+# 同じ信号を多重解像度の解析と BLOCK_SIZE の窓（SpectrumAnalyzer と同じプラン）に通し、
+# カーブを掛ける前のバーの RMS を比べる。ノイズは解像度ごとの領域で差の中央値、
+# 純音は最も高いバーの値を比べる。低域の純音は BLOCK_SIZE 側でバーに 1〜2 ビンしか
+# 入らずビンとの位置関係で値が 2dB ほど揺れるので、許容差はその分を見込んでいる。
+
+def band_levels(mode, scale, signal, sr=48000, n_bars=N_BARS):
+    # → (STFT, 解析器, 多重解像度のバーの RMS, BLOCK_SIZE の窓のバーの RMS)（フレーム平均）
+    resolutions = PYRAMID_RESOLUTIONS if mode == "pyramid" else RESOLUTIONS
+    ring = RingBuffer(RESOLUTIONS[0][0] * 4)
+    stft = MultiResolutionSTFT(ring, resolutions)
+    analyzer = MultiResolutionAnalyzer(sr, n_bars, resolutions, scale)
+    plan = get_plan(BLOCK_SIZE, sr, n_bars, scale)
+
+    # どの解像度の窓も埋まってから測る
+    settle = max(n * f for n, _, f in stft.resolutions) * 2
+    multi, single = np.zeros(n_bars), np.zeros(n_bars)
+    count = 0
+    for i in range(0, len(signal), stft.hop_size):
+        ring.write(signal[i:i + stft.hop_size])
+        for windows in stft.frames():
+            analyzer.analyze(windows)
+            if stft.end < settle:
+                continue
+            window = ring.latest(BLOCK_SIZE, stft.end) * plan.window
+            multi += analyzer.power
+            single += plan.bands.band_power(np.abs(np.fft.rfft(window)))
+            count += 1
+
+    return stft, analyzer, multi / count, single / count
+
+
+def check_levels(mode, scale, sr=48000, seconds=LEVEL_CHECK_SECONDS, tolerance=LEVEL_CHECK_TOLERANCE):
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+
+    noise = np.random.default_rng(0).uniform(-0.5, 0.5, n).astype(np.float32)
+    stft, analyzer, multi, single = band_levels(mode, scale, noise, sr)
+    diff = 20 * np.log10(multi / single)
+    regions = {}
+    for k, (size, _, factor) in enumerate(stft.resolutions):
+        mask = analyzer.source == k
+        if mask.any():
+            regions[f"{size}/{factor}"] = float(np.median(diff[mask]))
+
+    tones = {}
+    for f in LEVEL_CHECK_TONES:
+        tone = (0.5 * np.sin(2 * np.pi * f * t)).astype(np.float32)
+        _, _, multi, single = band_levels(mode, scale, tone, sr)
+        tones[f] = float(20 * np.log10(multi.max() / single.max()))
+
+    worst = max(abs(d) for d in list(regions.values()) + list(tones.values()))
+    return {
+        "mode": mode,
+        "scale": scale or "bands",
+        "noise_db": regions,
+        "tone_db": tones,
+        "worst_db": worst,
+        "ok": worst <= tolerance,
+    }
+
+# ==============================
+# 入力のブロック長の掃引
+# ==============================
+#
+# 実時間の合成信号（デバイスと同じくブロックの最後のサンプルの時刻に届く）を
+# ライブと同じ STFT・解析スレッドへ流し、FPS で回る読み手が新しいフレームを受け取るまでの
+# 遅延と、プロセス全体の CPU 使用率（信号の生成も含む）を測る。画面更新は含めない。
+#   latency  フレームの最新サンプルの取り込み → 読み出し
+#   worst    前に読んだフレームより後の最も古いサンプル → 読み出し（その間に鳴った音の最大の遅れ）
+# デバイス側のバッファ（ADC → コールバック）は含まないので、実機ではその分が足される。
+
+def percentiles_ms(timer):
+    # {"p50", "p95", "p99"} の ms（まだ記録が無ければ None）
+    p = timer.percentiles()
+    if p is None:
+        return None
+    return {"p50": float(p[0] / 1e3), "p95": float(p[1] / 1e3), "p99": float(p[2] / 1e3)}
+
+
+def format_ms(p):
+    return "n/a" if p is None else f"{p['p50']:.1f}/{p['p95']:.1f}/{p['p99']:.1f} ms"
+
+
+def measure_capture(block, seconds=CAPTURE_SWEEP_SECONDS, sr=48000):
+    source = SyntheticSource("sweep", sr, 2, block, sweep_period=4.0)
+    source.telemetry = telemetry = CaptureTelemetry()
+
+    ring = RingBuffer(RING_SIZE)
+    analysis = StageTimer()
+    worker = AnalysisWorker(
+        StreamingSTFT(ring, BLOCK_SIZE, HOP_SIZE), SpectrumAnalyzer(sr, N_BARS),
+        timer=analysis, telemetry=telemetry
+    )
+
+    bar_heights = np.zeros(N_BARS)
+    latency = StageTimer(int(seconds * FPS) + 1)
+    worst = StageTimer(int(seconds * FPS) + 1)
+    shown_seq = 0
+    shown_stamp = 0.0
+
+    source.start(ring)
+    worker.start()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+
+    # 描画ループの代わり（FPS ごとに最新フレームを読む）
+    next_frame = wall0
+    while time.perf_counter() - wall0 < seconds:
+        seq = worker.slot.read(bar_heights)
+        if seq != shown_seq:
+            now = time.perf_counter()
+            shown_seq = seq
+            if worker.slot.stamp:
+                latency.record(int((now - worker.slot.stamp) * 1e9))
+                if shown_stamp:
+                    worst.record(int((now - shown_stamp) * 1e9))
+            shown_stamp = worker.slot.stamp
+
+        next_frame += 1 / FPS
+        wait = next_frame - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    worker.stop()
+    source.stop()
+
+    analysis_us = analysis.percentiles()
+    return {
+        "block": block,
+        "block_ms": block / sr * 1000,
+        "callbacks": telemetry.count,
+        "overflows": telemetry.overflows,
+        # 短い計測・大きなブロックでフレームが 1 つも（worst は 2 つ）届かなければ None
+        "latency_ms": percentiles_ms(latency),
+        "worst_ms": percentiles_ms(worst),
+        "analysis_us_p50": None if analysis_us is None else float(analysis_us[0]),
+        "cpu_percent": cpu / wall * 100,
+    }
+
+# ==============================
+# 起動時間
+# ==============================
+
+def measure_startup(runs):
+    # プロセス生成から最初のフレームを描き終えるまでの ms
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            (sys.executable,) + STARTUP_CMD,
+            stdout=subprocess.PIPE, text=True
+        )
+        for line in proc.stdout:
+            if line.startswith(STARTUP_MARKER):
+                times.append((time.perf_counter() - t0) * 1000)
+                break
+        proc.stdout.read()
+        if proc.wait() != 0:
+            raise RuntimeError(f"startup run failed with exit code {proc.returncode}")
+
+    return {
+        "runs": runs,
+        "min": float(np.min(times)),
+        "p50": float(np.percentile(times, 50)),
+        "max": float(np.max(times)),
+    }
+
+# ==============================
+# ベースライン比較
+# ==============================
+
+def compare(results, baseline, tolerance=TOLERANCE, startup=None):
+    # 戻り値：退行の説明文のリスト（空なら合格）
+    regressions = []
+    base = baseline.get("results", {})
+
+    for key, r in results.items():
+        b = base.get(key)
+        if b is None:
+            continue
+
+        if r["fps"] < b["fps"] * (1 - tolerance):
+            regressions.append(f"{key}: fps {r['fps']:.1f} < baseline {b['fps']:.1f}")
+
+        # 数 KiB の揺れで落ちないよう 1 KiB の余裕を持たせる
+        limit = b["alloc_kib_per_frame"] * (1 + tolerance) + 1
+        if r["alloc_kib_per_frame"] > limit:
+            regressions.append(
+                f"{key}: alloc {r['alloc_kib_per_frame']:.1f} KiB > baseline {b['alloc_kib_per_frame']:.1f} KiB"
+            )
+
+    b = baseline.get("startup_ms")
+    if startup is not None and b is not None:
+        # 起動時間はプロセス生成の揺れが大きいので 50ms の余裕を持たせる
+        if startup["p50"] > b["p50"] * (1 + tolerance) + 50:
+            regressions.append(f"startup: {startup['p50']:.0f} ms > baseline {b['p50']:.0f} ms")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audio Visualizer headless benchmark")
+    parser.add_argument("--full", action="store_true", help="全組み合わせを掃引")
+    parser.add_argument("--frames", type=int, default=BENCH_FRAMES)
+    parser.add_argument("-o", "--output", help="結果 JSON の出力先（省略時は標準出力）")
+    parser.add_argument("--baseline", help="比較するベースライン JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="結果をベースラインとして保存")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="許容する低下率（既定 0.2）")
+    parser.add_argument("--startup", type=int, default=0, metavar="N", help="掃引の代わりに起動時間を N 回計測")
+    parser.add_argument("--alloc-check", action="store_true", help="解析経路の毎フレーム確保が 0 か検査")
+    parser.add_argument("--level-check", action="store_true", help="多重解像度の各帯域が通常の解析と同じ値か検査")
+    parser.add_argument(
+        "--capture-sweep", nargs="*", type=int, metavar="FRAMES",
+        help=f"入力のブロック長ごとの遅延と CPU を測る（省略時は {' '.join(map(str, CAPTURE_SWEEP_BLOCKS))}）"
+    )
+    parser.add_argument("--sweep-seconds", type=float, default=CAPTURE_SWEEP_SECONDS, help="掃引の 1 構成あたりの秒数")
+    args = parser.parse_args(argv)
+
+    if args.level_check:
+        checks = [check_levels(m, s) for m in LEVEL_CHECK_MODES for s in ALLOC_CHECK_SCALES]
+        for c in checks:
+            noise = ", ".join(f"{k} {d:+.1f}" for k, d in c["noise_db"].items())
+            tones = ", ".join(f"{f} {d:+.1f}" for f, d in c["tone_db"].items())
+            print(
+                f"[Bench] level {c['mode']}/{c['scale']}: noise {noise} dB | tone {tones} dB"
+                + ("" if c["ok"] else "  FAILED"),
+                file=sys.stderr
+            )
+        print(json.dumps({"level_check": checks}, indent=2))
+        return 0 if all(c["ok"] for c in checks) else 1
+
+    if args.capture_sweep is not None:
+        sweep = []
+        for block in args.capture_sweep or CAPTURE_SWEEP_BLOCKS:
+            r = measure_capture(block, args.sweep_seconds)
+            print(
+                f"[Bench] capture block {block} ({r['block_ms']:.1f} ms): "
+                f"latency {format_ms(r['latency_ms'])}, worst {format_ms(r['worst_ms'])}, "
+                f"cpu {r['cpu_percent']:.1f}%",
+                file=sys.stderr
+            )
+            sweep.append(r)
+        print(json.dumps({"hop_size": HOP_SIZE, "window_size": BLOCK_SIZE, "capture_sweep": sweep}, indent=2))
+        return 0
+
+    if args.alloc_check:
+        checks = [check_allocations(m, s) for m in ALLOC_CHECK_MODES for s in ALLOC_CHECK_SCALES]
+        for c in checks:
+            print(
+                f"[Bench] alloc {c['mode']}/{c['scale']}: net {c['net_bytes']} B, "
+                f"peak {c['peak_bytes']} B/frame, gc {c['gc_runs']}"
+                + ("" if c["ok"] else "  FAILED"),
+                file=sys.stderr
+            )
+        print(json.dumps({"alloc_check": checks}, indent=2))
+        return 0 if all(c["ok"] for c in checks) else 1
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    import pygame
+
+    results = {}
+    startup = None
+    if args.startup:
+        startup = measure_startup(args.startup)
+        print(f"[Bench] startup: {startup['p50']:.0f} ms (p50 of {args.startup})", file=sys.stderr)
+    else:
+        pygame.display.init()
+        for cfg in sweep_configs(args.full):
+            key = config_key(cfg)
+            results[key] = run_config(cfg, frames=args.frames)
+            print(f"[Bench] {key}: {results[key]['fps']:.0f} fps", file=sys.stderr)
+        pygame.quit()
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if startup is not None:
+        report["startup_ms"] = startup
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, startup)
+        for line in regressions:
+            print(f"[Bench] REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
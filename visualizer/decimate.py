@@ -0,0 +1,127 @@
+# ==============================
+# 間引きピラミッド（低域用の低レート信号）
+# ==============================
+#
+# 入力リングの新しいサンプルを 1/2 ずつ間引く段に順に通し、指定した倍率の
+# 信号をそれぞれ専用のリングへ書く。各段は短いハーフバンド FIR で帯域を
+# 制限しつつ、残す位相（1 つおき）の出力だけを計算する（ポリフェーズ）。
+# ハーフバンドは係数の約半分が 0 なので、実際の積和は窓長の半分ほど。
+# フィルタの状態（直前の taps - 1 サンプル）はブロックをまたいで保持し、
+# 計算はブロック単位のベクトル演算（ずらした窓のビューと係数の行列積）で行う。
+# 1/16 まで落とせば 1024 点の FFT で 16384 点と同じ周波数分解能が得られる。
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from visualizer.ringbuffer import RingBuffer
+
+HALFBAND_TAPS = 31
+
+# 間引き後のナイキストに対して、低域のバーに使ってよい帯域の割合
+# （ハーフバンドの遷移帯に掛かるバーは使わない）
+PYRAMID_PASSBAND = 0.8
+
+
+def halfband_taps(n_taps=HALFBAND_TAPS):
+    # 窓付き sinc の低域通過（遮断 fs/4、DC ゲイン 1）。中央以外の偶数番目は 0
+    k = np.arange(n_taps) - (n_taps - 1) / 2
+    h = 0.5 * np.sinc(k / 2) * np.blackman(n_taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+class HalfbandDecimator:
+    # taps の長さは 4k + 3（中央以外の 0 でない係数が偶数番目に来る形）
+
+    def __init__(self, n_taps=HALFBAND_TAPS):
+        if n_taps % 4 != 3:
+            raise ValueError("halfband length must be 4k + 3")
+
+        self.taps = halfband_taps(n_taps)
+        self.center = (n_taps - 1) // 2
+
+        # ポリフェーズ分解：偶数番目の係数は同じ位相のサンプル列との内積、
+        # 中央の係数はもう一方の位相のサンプル 1 つに掛かるだけ
+        # （float32 同士の積和は遅いので float64 で計算する）
+        self._even = self.taps[0::2].astype(np.float64)
+        self._mid = float(self.taps[self.center])
+        self._n_hist = n_taps - 1
+
+        # 作業用配列：先頭 n_hist が直前のサンプル（フィルタの状態）、続けて今回のブロック
+        # （★ ブロックが前より長い時だけ作り直す。定常状態では確保が無い）
+        self._x = np.zeros(self._n_hist)
+        self._out = np.empty(0)
+        self._tmp = np.empty(0)
+        self._frames = None
+
+        # これまでに受け取った総サンプル数（残す位相の判定用）
+        self._pos = 0
+
+    def process(self, block):
+        # 入力の奇数番目（通算）の位置でだけ出力する → 出力数は通算で入力の半分
+        # 戻り値は作業用配列のビュー（次の process で上書きされる）
+        n, h = len(block), self._n_hist
+        if len(self._x) < h + n:
+            x = np.zeros(h + n)
+            x[:h] = self._x[:h]
+            self._x = x
+            self._out = np.empty((n + 1) // 2)
+            self._tmp = np.empty((n + 1) // 2)
+
+            # 位相ごとに「出力 j → x[first + 2j :] の先頭 len(_even) 個」のずらした窓のビュー
+            step = x.strides[0] * 2
+            rows = (n + 1) // 2
+            self._frames = [
+                as_strided(x[first:], (rows, len(self._even)), (step, step), writeable=False)
+                for first in (0, 1)
+            ]
+        x = self._x
+        x[h:h + n] = block
+
+        first = (1 - self._pos) % 2
+        m = (n - first + 1) // 2
+        out, tmp = self._out[:m], self._tmp[:m]
+
+        # 出力 j は x[first + 2j :: 2] の先頭 len(_even) 個と偶数番目の係数の内積
+        np.matmul(self._frames[first][:m], self._even, out=out)
+        np.multiply(x[first + self.center:first + self.center + 2 * m:2], self._mid, out=tmp)
+        np.add(out, tmp, out=out)
+
+        x[:h] = x[n:n + h]
+        self._pos += n
+        return out
+
+
+class DecimationPyramid:
+
+    def __init__(self, ring, factors, capacity):
+        # factors: 出力する間引き倍率（2 のべき）。capacity: 各出力リングの長さ
+        levels = [int(np.log2(f)) for f in factors]
+        if any(2 ** lv != f or lv < 1 for lv, f in zip(levels, factors)):
+            raise ValueError("decimation factors must be powers of two (>= 2)")
+
+        self.ring = ring
+        self.stages = [HalfbandDecimator() for _ in range(max(levels))]
+        self.outputs = {f: RingBuffer(capacity) for f in factors}
+
+        # 入力リングのどこまで処理したか
+        self._pos = ring.write_pos
+
+    def pump(self, end=None):
+        # 入力リングの end（総サンプル位置）までを間引いて各出力リングへ書く
+        if end is None:
+            end = self.ring.write_pos
+
+        # 上書きされた区間は飛ばす（フィルタ状態は繋がらないが一瞬のこと）
+        start = max(self._pos, end - self.ring.capacity)
+        if end <= start:
+            return
+        self._pos = end
+
+        x = self.ring.latest(end - start, end)
+        factor = 1
+        for stage in self.stages:
+            x = stage.process(x)
+            factor *= 2
+            out = self.outputs.get(factor)
+            if out is not None:
+                out.write(x)
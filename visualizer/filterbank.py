@@ -0,0 +1,156 @@
+# ==============================
+# 周波数尺度と三角フィルタバンク
+# ==============================
+#
+# 尺度（mel / bark / erb / log）上で等間隔に並べた三角フィルタをパワースペクトルに
+# 掛けて、バーごとのエネルギーを出す。矩形バンドと違い隣のバーと裾が重なるので、
+# ビン間隔より狭いバーでも値が飛ばない。
+# 重み行列は (尺度, バー数, n_fft, SR) ごとにキャッシュする。バッチ（オフライン）は
+# 非ゼロの列範囲だけを持つ帯行列との 1 回の行列積、1 フレームずつのライブ解析は
+# 非ゼロ要素だけを集める疎な積（行列積は行列の読み出しが律速になり 4 倍ほど遅い）。
+
+from functools import lru_cache
+
+import numpy as np
+
+MIN_FREQ = 20
+
+# 尺度 × バー数 × n_fft × SR の組み合わせを数個だけ保持
+FILTERBANK_CACHE_SIZE = 8
+
+
+def create_custom_log_bins(sr, n_bars, linear_cutoff=800, linear_ratio=0.5, min_freq=MIN_FREQ):
+    linear_bins = int(n_bars * linear_ratio)
+    log_bins = n_bars - linear_bins
+    linear_edges = np.linspace(min_freq, linear_cutoff, linear_bins + 1)
+    log_edges = np.logspace(np.log10(linear_cutoff), np.log10(sr / 2), log_bins + 1)
+    return np.concatenate((linear_edges[:-1], log_edges))
+
+# ==============================
+# 尺度（Hz ⇔ 尺度）
+# ==============================
+
+def hz_to_mel(f):
+    return 2595 * np.log10(1 + f / 700)
+
+
+def mel_to_hz(m):
+    return 700 * (10 ** (m / 2595) - 1)
+
+
+def hz_to_bark(f):
+    # Traunmüller (1990)
+    return 26.81 * f / (1960 + f) - 0.53
+
+
+def bark_to_hz(z):
+    return 1960 * (z + 0.53) / (26.28 - z)
+
+
+def hz_to_erb(f):
+    # Glasberg & Moore (1990) の ERB 数
+    return 21.4 * np.log10(1 + 0.00437 * f)
+
+
+def erb_to_hz(e):
+    return (10 ** (e / 21.4) - 1) / 0.00437
+
+
+SCALES = {
+    "mel": (hz_to_mel, mel_to_hz),
+    "bark": (hz_to_bark, bark_to_hz),
+    "erb": (hz_to_erb, erb_to_hz),
+}
+
+# "log" は create_custom_log_bins（800Hz まで線形・以降対数）と同じ並び
+SCALE_NAMES = tuple(SCALES) + ("log",)
+
+
+def filter_points(scale, n_bars, sr):
+    # バー i の三角フィルタは (points[i], points[i + 1], points[i + 2])（裾・頂点・裾）
+    if scale == "log":
+        edges = create_custom_log_bins(sr, n_bars)
+        centers = (edges[:-1] + edges[1:]) / 2
+        return np.concatenate(([edges[0]], centers, [edges[-1]]))
+
+    if scale not in SCALES:
+        raise ValueError(f"unknown frequency scale: {scale}")
+
+    to_scale, from_scale = SCALES[scale]
+    return from_scale(np.linspace(to_scale(MIN_FREQ), to_scale(sr / 2), n_bars + 2))
+
+# ==============================
+# フィルタバンク
+# ==============================
+
+class Filterbank:
+
+    def __init__(self, points, freqs):
+        left, center, right = points[:-2], points[1:-1], points[2:]
+        self.n_bars = len(center)
+
+        # 帯域がビン間隔より狭いと、どのビンにも掛からないバーが出るので
+        # 裾を最低 1 ビンぶん広げる（頂点の両側のビンを線形補間する形になる）
+        df = freqs[1] - freqs[0]
+        left = np.minimum(left, center - df)
+        right = np.maximum(right, center + df)
+
+        f = freqs[None, :]
+        up = (f - left[:, None]) / (center - left)[:, None]
+        down = (right[:, None] - f) / (right - center)[:, None]
+        weights = np.maximum(0, np.minimum(up, down))
+
+        # 重みの和を 1 にする（矩形バンドの RMS とスケールを揃える）
+        # ナイキストより上のバー（間引いた信号の場合）は重みが全て 0 のまま
+        sums = weights.sum(axis=1, keepdims=True)
+        np.divide(weights, sums, out=weights, where=sums > 0)
+
+        # 非ゼロの列範囲だけを (列, バー) の向きで持つ
+        cols = np.nonzero(weights.any(axis=0))[0]
+        self.lo = int(cols[0])
+        self.hi = int(cols[-1]) + 1
+        band = weights[:, self.lo:self.hi]
+        self.weights_t = np.ascontiguousarray(band.T)
+
+        # 疎な形（行ごとに連続して並ぶ非ゼロ要素の列番号と重み、各行の先頭位置）
+        # 末尾の 0 は空の行でも reduceat の添字が範囲内に収まるようにするため
+        rows, cols = np.nonzero(band)
+        self.cols = np.append(cols, 0)
+        self.data = np.append(band[rows, cols], 0)
+        self.row_starts = np.searchsorted(rows, np.arange(self.n_bars))
+        self.empty_rows = np.bincount(rows, minlength=self.n_bars) == 0
+        self._has_empty = bool(self.empty_rows.any())
+        self._take = self.cols + self.lo
+
+        # 隣り合う頂点の中点をバーの境界とみなす（BandEngine のビン数集計用）
+        self.edges = np.concatenate(([points[0]], (center[:-1] + center[1:]) / 2, [points[-1]]))
+
+    def apply(self, fft, out=None, gather=None):
+        # 振幅スペクトル (..., n_freqs) → バーごとの RMS (..., n_bars)
+        # out / gather（(..., len(cols))）を渡せば疎な積で確保なしで済む
+        # （ライブ解析の 1 フレームや数チャンネル。渡さないバッチは帯行列との行列積）
+        if out is None:
+            out = np.empty(fft.shape[:-1] + (self.n_bars,))
+
+        if gather is None:
+            if fft.ndim > 1:
+                sq = np.square(fft[..., self.lo:self.hi])
+                np.matmul(sq, self.weights_t, out=out)
+                return np.sqrt(out, out=out)
+            gather = np.empty(len(self.cols))
+
+        # mode="raise"（既定）だと out が一時配列越しに書かれるので clip にする（添字は常に範囲内）
+        fft.take(self._take, axis=-1, out=gather, mode="clip")
+        np.square(gather, out=gather)
+        np.multiply(gather, self.data, out=gather)
+        np.add.reduceat(gather, self.row_starts, axis=-1, out=out)
+        if self._has_empty:
+            np.copyto(out, 0.0, where=self.empty_rows)
+        return np.sqrt(out, out=out)
+
+
+@lru_cache(maxsize=FILTERBANK_CACHE_SIZE)
+def get_filterbank(scale, n_bars, n_fft, sr, band_sr=None):
+    # band_sr: バーの並びを決める SR（間引いた信号を元の SR のバーに集計する時に指定）
+    freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+    return Filterbank(filter_points(scale, n_bars, band_sr or sr), freqs)
@@ -0,0 +1,89 @@
+# ==============================
+# バー色のグラデーション LUT
+# ==============================
+#
+# 正規化済みの高さ (0..1) を量子化して引く RGB テーブル。起動時に 1 回だけ作る。
+#   stops       : 色のリスト（等間隔）または (位置, 色) のリスト
+#   gamma       : 高さ → グラデーション位置 の曲線（位置 = 高さ ** gamma）
+#   stops_high  : 指定すると低域バー = stops、高域バー = stops_high として
+#                 バーごとに補間した 2-D LUT (n_bars, size, 3) になる
+
+import numpy as np
+
+COLOR_START = (173, 216, 230)
+COLOR_END = (255, 140, 160)
+COLOR_GAMMA = 3.0
+
+DEFAULT_STOPS = (COLOR_START, COLOR_END)
+LUT_SIZE = 1024
+
+
+def _normalize_stops(stops):
+    if len(stops) < 2:
+        raise ValueError("gradient needs at least two stops")
+
+    if len(stops[0]) == 2:
+        pos = np.array([p for p, _ in stops], dtype=np.float64)
+        colors = np.array([c for _, c in stops], dtype=np.float64)
+    else:
+        pos = np.linspace(0, 1, len(stops))
+        colors = np.array(stops, dtype=np.float64)
+
+    if np.any(np.diff(pos) < 0):
+        raise ValueError("gradient stop positions must be increasing")
+
+    return pos, colors
+
+
+def gradient_colors(stops, c):
+    # グラデーション位置 c (0..1) の色（float）
+    pos, colors = _normalize_stops(stops)
+    return np.stack([np.interp(c, pos, colors[:, ch]) for ch in range(3)], axis=-1)
+
+
+def build_lut(stops=DEFAULT_STOPS, gamma=COLOR_GAMMA, size=LUT_SIZE):
+    mag = np.arange(size) / (size - 1)
+    return gradient_colors(stops, mag ** gamma).astype(int)
+
+
+class GradientLUT:
+
+    def __init__(self, stops=DEFAULT_STOPS, gamma=COLOR_GAMMA, size=LUT_SIZE,
+                 stops_high=None, n_bars=None):
+        self.size = size
+
+        if stops_high is None:
+            self.table = build_lut(stops, gamma, size)
+        else:
+            if n_bars is None:
+                raise ValueError("per-bar gradient needs n_bars")
+
+            mag = np.arange(size) / (size - 1)
+            low = gradient_colors(stops, mag ** gamma)
+            high = gradient_colors(stops_high, mag ** gamma)
+
+            t = (np.arange(n_bars) / max(n_bars - 1, 1))[:, None, None]
+            self.table = (low * (1 - t) + high * t).astype(int)
+
+        self.per_bar = self.table.ndim == 3
+
+    def index(self, display_heights):
+        # 高さ → LUT の添字
+        return np.rint(display_heights * (self.size - 1)).astype(np.intp)
+
+    def lookup(self, table, idx):
+        # table は self.table かそれをサーフェス形式へ変換したもの
+        if self.per_bar:
+            return table[np.arange(len(idx)), idx]
+        return table[idx]
+
+    def colors(self, display_heights):
+        return self.lookup(self.table, self.index(display_heights))
+
+    def mapped(self, surface):
+        # サーフェスのピクセル形式に変換したテーブル（毎フレームの map が不要になる）
+        import pygame
+
+        flat = self.table.reshape(-1, 3)
+        mapped = pygame.surfarray.map_array(surface, flat).astype(np.uint32)
+        return mapped.reshape(self.table.shape[:-1])
@@ -0,0 +1,98 @@
+# ==============================
+# 無音時のアイドルモード
+# ==============================
+#
+# リングに新しく書かれたサンプルの RMS をヒステリシス付きのゲートで見て、
+# 無音が IDLE_HOLD 秒続き、かつ画面のバーが下がりきったらアイドルに入る。
+# アイドル中は解析スレッドが FFT を飛ばし、描画ループは描画・画面更新をせず
+# IDLE_FPS でイベントだけ拾う。音が戻ると解析スレッドが wake を立てるので、
+# 描画ループは次のポーリング（hop の半分）以内に起きる。
+
+import threading
+import time
+
+import numpy as np
+
+IDLE_OPEN_DB = -60     # これを超えたら有音（dBFS）
+IDLE_CLOSE_DB = -66    # これを下回り続けたら無音
+IDLE_HOLD = 0.5        # 無音と判定するまでの秒数
+IDLE_FPS = 4           # アイドル中にイベントを拾う頻度
+
+
+class IdleMonitor:
+
+    def __init__(self, ring, sr, open_db=IDLE_OPEN_DB, close_db=IDLE_CLOSE_DB, hold=IDLE_HOLD):
+        self.ring = ring
+        self.open_power = 10 ** (open_db / 10)
+        self.close_power = 10 ** (close_db / 10)
+        self.hold = hold
+        self.hold_samples = int(hold * sr)
+
+        # ゲートの状態（解析スレッドが更新）
+        self.sound = True
+        self._pos = ring.write_pos
+        self._quiet = 0
+
+        # 音が戻ったら立つ（描画ループが待つ）
+        self.wake = threading.Event()
+
+        # アイドル状態と経過時間（描画ループが更新）
+        self.idle = False
+        self._since = time.perf_counter()
+        self._spent = {False: 0.0, True: 0.0}
+
+    def set_sr(self, sr):
+        # 入力のサンプルレートが変わった時（デバイスの再接続など）
+        self.hold_samples = int(self.hold * sr)
+
+    def update(self):
+        # 前回以降にリングへ書かれた分でゲートを進める（解析スレッドから呼ぶ）
+        end = self.ring.write_pos
+        n = min(end - self._pos, self.ring.capacity)
+        self._pos = end
+        if n <= 0:
+            return self.sound
+
+        # 多チャンネルのリングなら全チャンネルの平均パワー
+        x = self.ring.latest(n, end)
+        power = float(np.vdot(x, x)) / x.size
+
+        if power > self.open_power:
+            self._quiet = 0
+            if not self.sound:
+                self.sound = True
+                self.wake.set()
+        elif power < self.close_power:
+            self._quiet += n
+            if self._quiet >= self.hold_samples:
+                self.sound = False
+
+        return self.sound
+
+    def set_idle(self, idle):
+        if idle == self.idle:
+            return
+        now = time.perf_counter()
+        self._spent[self.idle] += now - self._since
+        self._since = now
+        self.idle = idle
+        if idle:
+            self.wake.clear()
+
+    def wait(self, timeout=1 / IDLE_FPS):
+        # アイドル中の待機。音が戻れば即座に返る
+        # （set_idle で wake を消した後に sound を見るので取りこぼさない）
+        if not self.sound:
+            self.wake.wait(timeout)
+
+    def times(self):
+        # (アイドル秒, 動作秒)
+        spent = dict(self._spent)
+        spent[self.idle] += time.perf_counter() - self._since
+        return spent[True], spent[False]
+
+    def format_line(self):
+        idle, active = self.times()
+        total = idle + active
+        ratio = idle / total * 100 if total > 0 else 0.0
+        return f"idle {idle:.1f} s / active {active:.1f} s ({ratio:.0f}% idle)"
@@ -0,0 +1,71 @@
+# ==============================
+# チャンネルのミキシング行列
+# ==============================
+#
+# 入力 (frames, 入力ch) に (入力ch, 出力ch) の行列を 1 回掛けてリングへ書く
+# （コールバック内でチャンネルごとのループを回さない）。
+#
+#   mono          全チャンネルの平均（従来の動作）
+#   left / right  0 / 1 番だけ
+#   lr            0 番と 1 番を別々の出力に
+#   mid / side    (L + R) / 2、(L - R) / 2
+#   ms            mid と side を別々の出力に
+#   ch:2,3        指定したチャンネルを別々の出力に
+#   avg:2,3       指定したチャンネルの平均を 1 出力に
+#   w:0.5,0.5,0,0;0,0,1,0   入力ごとの重み（; で区切ると複数の出力）
+
+import numpy as np
+
+MIX_PRESETS = ("mono", "left", "right", "lr", "mid", "side", "ms")
+
+
+def _column(n_in, weights):
+    col = np.zeros(n_in, dtype=np.float32)
+    for ch, w in weights:
+        if not 0 <= ch < n_in:
+            raise ValueError(f"channel {ch} out of range (device has {n_in})")
+        col[ch] += w
+    return col
+
+
+def _channels(arg):
+    return [int(c) for c in arg.split(",") if c.strip()]
+
+
+def mix_matrix(spec, n_in):
+    # → (n_in, 出力ch) の float32 行列
+    kind, _, arg = spec.partition(":")
+
+    # モノラル入力の L/R は同じチャンネルを指す
+    right = 1 if n_in > 1 else 0
+
+    if kind == "mono":
+        cols = [_column(n_in, [(c, 1 / n_in) for c in range(n_in)])]
+    elif kind == "left":
+        cols = [_column(n_in, [(0, 1)])]
+    elif kind == "right":
+        cols = [_column(n_in, [(right, 1)])]
+    elif kind == "lr":
+        cols = [_column(n_in, [(0, 1)]), _column(n_in, [(right, 1)])]
+    elif kind in ("mid", "side", "ms"):
+        mid = _column(n_in, [(0, 0.5), (right, 0.5)])
+        side = _column(n_in, [(0, 0.5), (right, -0.5)])
+        cols = {"mid": [mid], "side": [side], "ms": [mid, side]}[kind]
+    elif kind == "ch":
+        cols = [_column(n_in, [(c, 1)]) for c in _channels(arg)]
+    elif kind == "avg":
+        chs = _channels(arg)
+        cols = [_column(n_in, [(c, 1 / len(chs)) for c in chs])] if chs else []
+    elif kind == "w":
+        cols = []
+        for out in arg.split(";"):
+            weights = [float(w) for w in out.split(",")]
+            if len(weights) > n_in:
+                raise ValueError(f"{len(weights)} weights for {n_in} channels")
+            cols.append(_column(n_in, enumerate(weights)))
+    else:
+        raise ValueError(f"unknown mix: {spec}")
+
+    if not cols:
+        raise ValueError(f"mix selects no channels: {spec}")
+    return np.stack(cols, axis=1)
@@ -0,0 +1,164 @@
+# ==============================
+# 多重解像度 FFT
+# ==============================
+#
+# 同じリングから長さの違う窓を別々の hop で取り出し（低域は長い窓で細かく、
+# 高域は短い窓で速く）、バーごとに前計算した解像度の値を 1 本のバー列にまとめる。
+# 各バーは「ビンが MIN_BINS_PER_BAR 本以上入る最も短い窓」を使う
+# （どの窓でも足りなければビンが最も多い窓）。高いバーほど窓が短くなるよう揃える。
+#
+# 解像度に間引き倍率を付けると、間引きピラミッドの出力（SR / 倍率）から窓を取る。
+# 窓の実際の長さは 窓長 × 倍率 で、使えるのは間引き後の通過帯域にあるバーだけ。
+
+import numpy as np
+
+from visualizer.decimate import PYRAMID_PASSBAND, DecimationPyramid
+from visualizer.settings import BLOCK_SIZE
+from visualizer.spectrum import AnalysisWork, BandWork, get_plan
+
+# (窓長, hop[, 間引き倍率])。hop は入力 SR のサンプル数で、最小の hop の倍数にする
+RESOLUTIONS = (
+    (16384, 2048),
+    (4096, 1024),
+    (1024, 512),
+)
+
+# 最低域を 1/16 に間引いた 1024 点で解析する（16384 点と同じ分解能で FFT は 1/16）
+PYRAMID_RESOLUTIONS = (
+    (1024, 2048, 16),
+    (4096, 1024),
+    (1024, 512),
+)
+
+MIN_BINS_PER_BAR = 3
+
+
+def _unpack(resolutions):
+    # → (窓長, hop, 倍率) のリスト
+    return [(r[0], r[1], r[2] if len(r) > 2 else 1) for r in resolutions]
+
+
+def select_resolutions(counts, min_bins=MIN_BINS_PER_BAR):
+    # counts: (解像度数, n_bars) の各バーのビン数（窓が短い順）→ バーごとの解像度番号
+    counts = np.asarray(counts)
+    enough = counts >= min_bins
+    most = len(counts) - 1 - counts[::-1].argmax(axis=0)   # 同数なら長い窓
+    choice = np.where(enough.any(axis=0), enough.argmax(axis=0), most)
+
+    # 隣り合うバーで窓が行き来しないよう、高域へ向かって単調に短くする
+    return np.minimum.accumulate(choice)
+
+
+class MultiResolutionSTFT:
+
+    def __init__(self, ring, resolutions=RESOLUTIONS):
+        self.ring = ring
+        self.resolutions = _unpack(resolutions)
+        self.hops = [h for _, h, _ in self.resolutions]
+
+        # 最小の hop ごとに 1 回返す（StreamingSTFT と同じ呼ばれ方をする）
+        self.hop_size = min(self.hops)
+        self.window_size = max([n for n, _, f in self.resolutions if f == 1] or [self.hop_size])
+        if any(h % self.hop_size for h in self.hops):
+            raise ValueError("hops must be multiples of the smallest hop")
+        if self.window_size > ring.capacity:
+            raise ValueError("window_size exceeds ring capacity")
+
+        # 間引いた解像度があればピラミッドを置く（出力リングは窓長の 2 倍）
+        factors = sorted({f for _, _, f in self.resolutions if f > 1})
+        self.pyramid = None
+        if factors:
+            longest = max(n for n, _, f in self.resolutions if f > 1)
+            self.pyramid = DecimationPyramid(ring, factors, longest * 2)
+
+        self._origin = ring.write_pos
+        self._next_end = ring.write_pos + self.hop_size
+
+        # 直前に返した窓の終端（StreamingSTFT.end と同じ）
+        self.end = ring.write_pos
+
+    def frames(self):
+        # 窓のリスト（resolutions と同じ順、その hop で更新が無い解像度は None）を返す
+        # ★ 中身はリングのビューなので次を取るまでに使い切ること
+        end = self.ring.write_pos
+
+        oldest = end - (self.ring.capacity - self.window_size)
+        if self._next_end < oldest:
+            behind = oldest - self._next_end
+            self._next_end += -(-behind // self.hop_size) * self.hop_size
+
+        while self._next_end <= end:
+            e = self._next_end
+
+            windows = []
+            for n, hop, factor in self.resolutions:
+                if (e - self._origin) % hop:
+                    windows.append(None)
+                elif factor == 1:
+                    windows.append(self.ring.latest(n, e))
+                else:
+                    # 間引きはその解像度の hop でまとめて進める（段ごとの呼び出し回数を減らす）
+                    self.pyramid.pump(e)
+                    windows.append(self.pyramid.outputs[factor].latest(n))
+
+            self.end = e
+            yield windows
+            self._next_end += self.hop_size
+
+
+class MultiResolutionAnalyzer:
+    # SpectrumAnalyzer と同じく analyze() ごとに n_bars 本の高さを返す
+
+    def __init__(self, sr, n_bars, resolutions=RESOLUTIONS, scale=None):
+        self.sr = sr
+        self.n_bars = n_bars
+        self.prev_bar_heights = np.zeros(n_bars)
+
+        resolutions = _unpack(resolutions)
+
+        # バーの境界は常に入力 SR で決める（間引いた解像度も同じバーに集計する）
+        # 時間スムージングは最小 hop ごとに更新するので、その間隔で係数を換算する
+        hop = min(h for _, h, _ in resolutions)
+        self.plans = [get_plan(n, sr / f, n_bars, scale, band_sr=sr, hop=hop) for n, _, f in resolutions]
+
+        # バーの値はバー内のビンの RMS。バーが数ビンにまたがれば、ビン 1 本あたりのエネルギーは
+        # 正弦波でもノイズでも（信号の SR）× Σ窓² に比例する（窓を長くするとバー内のビン数も増える）。
+        # BLOCK_SIZE の窓（入力 SR）と同じ値になるよう、この比の平方根を掛ける
+        # （1024 点なら ×2、16384 点なら ×1/2、1/16 に間引いた 1024 点なら ×8）
+        reference = sr * np.sum(np.hanning(BLOCK_SIZE) ** 2)
+        self.scales = [float(np.sqrt(reference / (plan.sr * np.sum(plan.window ** 2)))) for plan in self.plans]
+
+        # 間引いた解像度は通過帯域を超えるバーに使わない
+        counts = []
+        for plan, (_, _, f) in zip(self.plans, resolutions):
+            usable = plan.log_bins[1:] <= PYRAMID_PASSBAND * sr / f / 2 if f > 1 else True
+            counts.append(plan.bands.counts * usable)
+
+        # バーごとに使う解像度（resolutions の添字）。実際の窓の長さで短い順に並べて選ぶ
+        by_size = np.argsort([n * f for n, _, f in resolutions], kind="stable")
+        self.source = by_size[select_resolutions([counts[k] for k in by_size])]
+        self._masks = [self.source == k for k in range(len(resolutions))]
+
+        # ゲート・カーブ・スムージングはバー位置と hop だけで決まるのでどのプランでも同じ
+        self.bands = self.plans[0].bands
+
+        # 各バーの最新の RMS（まだ更新の無い解像度のバーは無音扱い）
+        self.power = np.full(n_bars, 1e-9)
+
+        # 作業用配列（定常状態では毎フレームの確保が無い）
+        self._works = [AnalysisWork(plan) for plan in self.plans]
+        self._curve_work = BandWork(self.bands)
+
+    def analyze(self, windows):
+        # 戻り値は prev_bar_heights そのもの（次の analyze で上書きされる）
+        for k, window in enumerate(windows):
+            if window is None:
+                continue
+            plan, work = self.plans[k], self._works[k]
+            power = plan.bands.band_power(work.magnitude(window, plan), work.bands)
+            np.multiply(power, self.scales[k], out=power)
+            np.copyto(self.power, power, where=self._masks[k])
+
+        work = self._curve_work
+        raw = self.bands.curve(self.power, work)
+        return self.bands.smooth(raw, self.prev_bar_heights, out=self.prev_bar_heights, work=work)
@@ -0,0 +1,320 @@
+# ==============================
+# オフラインレンダリング（WAV → フレーム列）
+# ==============================
+#
+# ライブと同じ解析・描画を、実時間を待たずに回して PNG 連番か
+# 生 RGB ストリームに書き出す（MV 制作用）。
+#
+#   python -m visualizer.offline music.wav -o frames/
+#   python -m visualizer.offline music.wav --format raw -o - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1920x300 -r 60 -i - out.mp4
+#   python -m visualizer.offline music.wav -o frames/ -j 0      （全コアで並列）
+
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+from visualizer.filterbank import SCALE_NAMES
+from visualizer.render import VISUAL_PEAK_DECAY, VISUAL_PEAK_MIN, BarRasterizer, PeakNormalizer
+from visualizer.settings import BAR_HEIGHT, BLOCK_SIZE, FPS, HOP_SIZE, N_BARS, VISUALIZER_HEIGHT
+from visualizer.sources import WavFileSource
+from visualizer.spectrum import (
+    GAIN_HIGH, GAIN_LOW, LOW_BOOST_MAX, SMOOTH_HIGH, SMOOTH_LOW, SpectrumAnalyzer, smooth_coefficient
+)
+
+# 2-D rfft 1 回あたりの hop 数（4096 点 × 256 で 8MB 程度）
+BATCH_HOPS = 256
+
+# ==============================
+# 解析
+# ==============================
+
+def load_mono(path):
+    src = WavFileSource(path, realtime=False)
+    data = src.read_all()
+
+    # RingBuffer.write と同じ手順でダウンミックス（float32 のまま）
+    mono = np.sum(data, axis=1)
+    np.divide(mono, data.shape[1], out=mono)
+    return src.sr, mono
+
+
+def hop_windows(mono, n_fft, hop):
+    # j 行目 = ライブで (j + 1) * hop サンプル目に解析される窓
+    # 開始前はリングの初期値と同じくゼロ
+    padded = np.concatenate((np.zeros(n_fft, dtype=mono.dtype), mono))
+    view = np.lib.stride_tricks.sliding_window_view(padded, n_fft)
+    return view[hop::hop]
+
+
+def analyze_hops(analyzer, windows, batch=BATCH_HOPS):
+    out = np.empty((len(windows), analyzer.n_bars))
+    for b in range(0, len(windows), batch):
+        out[b:b + batch] = analyzer.analyze_batch(windows[b:b + batch])
+    return out
+
+
+def frame_hop_index(frame, sr, fps, hop):
+    # フレーム提示時点までに解析済みの最新 hop（-1 ならまだ無い）
+    return (frame * sr // fps) // hop - 1
+
+# ==============================
+# 出力
+# ==============================
+
+class PngSequenceWriter:
+
+    def __init__(self, directory, pattern="frame_{:06d}.png", start=0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pattern = pattern
+        self.start = start
+        self.count = 0
+
+    def write(self, surface):
+        name = self.pattern.format(self.start + self.count)
+        pygame.image.save(surface, os.path.join(self.directory, name))
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class RawRGBWriter:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, surface):
+        self.stream.write(pygame.image.tobytes(surface, "RGB"))
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+
+# ==============================
+# レンダリング
+# ==============================
+
+def count_frames(n_samples, sr, fps):
+    return -(-n_samples * fps // sr)
+
+
+def render_frames(bars, frames, sr, fps, width, height=VISUALIZER_HEIGHT, hop=HOP_SIZE,
+                  first_hop=0, warmup=0):
+    # bars: first_hop 番目からの hop ごとのバー高さ
+    # ライブと同じくフレームごとに visual_peak を進める。先頭 warmup フレームは
+    # visual_peak を進めるだけで描画しない
+    n_bars = bars.shape[1]
+    bar_width = width // n_bars
+
+    surface = pygame.Surface((width, height))
+    raster = BarRasterizer(surface, n_bars, bar_width, BAR_HEIGHT)
+    normalizer = PeakNormalizer()
+    silent = np.zeros(n_bars)
+
+    for i, k in enumerate(frames):
+        j = frame_hop_index(k, sr, fps, hop) - first_hop
+        bar_heights = bars[j] if j >= 0 else silent
+
+        display_heights = normalizer(bar_heights)
+        if i < warmup:
+            continue
+
+        raster.draw(display_heights)
+        yield surface
+
+
+def render_file(path, writer, fps=FPS, width=1920, height=VISUALIZER_HEIGHT,
+                n_fft=BLOCK_SIZE, hop=HOP_SIZE, n_bars=N_BARS, scale=None):
+    sr, mono = load_mono(path)
+
+    analyzer = SpectrumAnalyzer(sr, n_bars, scale, hop=hop)
+    bars = analyze_hops(analyzer, hop_windows(mono, n_fft, hop))
+
+    frames = range(count_frames(len(mono), sr, fps))
+    for surface in render_frames(bars, frames, sr, fps, width, height, hop):
+        writer.write(surface)
+    writer.close()
+
+    return writer.count
+
+# ==============================
+# 並列レンダリング
+# ==============================
+#
+# 曲をフレーム区間に分けてプロセスごとに描画する。各ワーカーは区間の手前から
+# ゼロ状態で解析を始め（プレロール）、時間スムージングと visual_peak を
+# 逐次実行と同じ値に収束させてから描画を始める。
+
+# 時間スムージングで最も減衰の遅いバーの初期値の影響が倍精度の分解能を下回るまでの hop 数
+# （係数は hop ごとに換算されるので SR と hop で決まる）
+PREROLL_EPS = 1e-17
+
+
+def preroll_hops(sr, hop):
+    coef = smooth_coefficient(min(SMOOTH_LOW, SMOOTH_HIGH), sr / hop)
+    return math.ceil(math.log(PREROLL_EPS) / math.log(1 - coef))
+
+
+# 取りうる最大のバー高さから visual_peak が VISUAL_PEAK_MIN まで減衰するフレーム数
+# （それ以下は表示に効かないので、以降は初期値に依らず一致する）
+PEAK_BOUND = max(GAIN_HIGH, GAIN_LOW * LOW_BOOST_MAX)
+PREROLL_FRAMES = math.ceil(math.log(VISUAL_PEAK_MIN / PEAK_BOUND) / math.log(VISUAL_PEAK_DECAY))
+
+MIN_CHUNK_FRAMES = 600
+
+_worker_track = None
+
+
+def _init_worker(path):
+    global _worker_track
+    _worker_track = load_mono(path)
+
+
+def _render_chunk(f0, f1, fps, width, height, n_fft, hop, n_bars, scale, fmt, target, offset=None):
+    # raw で offset を渡すと、既存のファイル target のその位置へ直接書く
+    sr, mono = _worker_track
+
+    # visual_peak 用のプレロール → その手前に解析用のプレロール
+    fp = max(0, f0 - PREROLL_FRAMES)
+    first_hop = max(0, frame_hop_index(fp, sr, fps, hop) - preroll_hops(sr, hop))
+    last_hop = frame_hop_index(f1 - 1, sr, fps, hop)
+
+    windows = hop_windows(mono, n_fft, hop)[first_hop:last_hop + 1]
+    bars = analyze_hops(SpectrumAnalyzer(sr, n_bars, scale, hop=hop), windows)
+
+    frames = render_frames(
+        bars, range(fp, f1), sr, fps, width, height, hop,
+        first_hop=first_hop, warmup=f0 - fp
+    )
+
+    if fmt == "png":
+        writer = PngSequenceWriter(target, start=f0)
+        for surface in frames:
+            writer.write(surface)
+        return writer.count
+
+    with open(target, "wb" if offset is None else "r+b") as f:
+        if offset is not None:
+            f.seek(offset)
+        writer = RawRGBWriter(f)
+        for surface in frames:
+            writer.write(surface)
+        writer.close()
+        return writer.count
+
+
+def render_file_parallel(path, fmt, target, fps=FPS, width=1920, height=VISUALIZER_HEIGHT,
+                         n_fft=BLOCK_SIZE, hop=HOP_SIZE, n_bars=N_BARS, scale=None,
+                         jobs=None, chunk_frames=None):
+    # fmt="png" なら target はディレクトリ、"raw" なら書き込み先のバイナリストリーム
+    src = WavFileSource(path, realtime=False)
+    n_frames = count_frames(src.n_frames, src.sr, fps)
+
+    jobs = jobs or os.cpu_count()
+    if chunk_frames is None:
+        chunk_frames = max(MIN_CHUNK_FRAMES, -(-n_frames // (jobs * 2)))
+
+    chunks = [(f0, min(f0 + chunk_frames, n_frames)) for f0 in range(0, n_frames, chunk_frames)]
+
+    # raw の書き先が通常のファイルなら、全体の大きさに広げて各ワーカーが自分の区間の
+    # オフセットへ直接書く。パイプなら区間ごとの一時ファイルを区間順に繋ぐ
+    direct = fmt == "raw" and _is_regular_file(target)
+    if direct:
+        base = target.tell()
+        frame_bytes = width * height * 3
+        target.truncate(base + n_frames * frame_bytes)
+        target.flush()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(path,)) as pool:
+
+        def submit(i):
+            f0, f1 = chunks[i]
+            if fmt == "png":
+                out, offset = target, None
+            elif direct:
+                out, offset = target.name, base + f0 * frame_bytes
+            else:
+                out, offset = os.path.join(tmp, f"chunk_{i:05d}.rgb"), None
+            args = (f0, f1, fps, width, height, n_fft, hop, n_bars, scale, fmt, out, offset)
+            return pool.submit(_render_chunk, *args), out
+
+        # ★ 先に投げるのは繋ぎ終えた区間から jobs 個先まで（読み手が遅くても
+        #   一時ファイルが曲全体ぶん積み上がらないように）
+        pending = deque(submit(i) for i in range(min(jobs, len(chunks))))
+        next_chunk = len(pending)
+
+        # 完了順ではなく区間順に繋ぐ
+        count = 0
+        while pending:
+            future, out = pending.popleft()
+            count += future.result()
+            if next_chunk < len(chunks):
+                pending.append(submit(next_chunk))
+                next_chunk += 1
+
+            if fmt == "raw" and not direct:
+                with open(out, "rb") as f:
+                    shutil.copyfileobj(f, target)
+                os.remove(out)
+
+    if direct:
+        target.seek(base + count * frame_bytes)
+    if fmt == "raw":
+        target.flush()
+
+    return count
+
+
+def _is_regular_file(stream):
+    # パイプ・端末ではなく、名前で開き直せる通常のファイルか
+    try:
+        return stream.seekable() and os.path.isfile(stream.name)
+    except (AttributeError, OSError, TypeError):
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audio Visualizer offline renderer")
+    parser.add_argument("input", help="入力 WAV ファイル")
+    parser.add_argument("-o", "--output", default="frames", help="PNG の出力先ディレクトリ / raw の出力ファイル（- で標準出力）")
+    parser.add_argument("--format", choices=("png", "raw"), default="png")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=VISUALIZER_HEIGHT)
+    parser.add_argument("--scale", choices=SCALE_NAMES, help="三角フィルタバンクの尺度（省略時は矩形バンド）")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="並列プロセス数（0 で全コア）")
+    args = parser.parse_args(argv)
+
+    size = (args.fps, args.width, args.height)
+
+    def run(target):
+        if args.jobs != 1:
+            return render_file_parallel(args.input, args.format, target, *size,
+                                        scale=args.scale, jobs=args.jobs or None)
+        if args.format == "png":
+            return render_file(args.input, PngSequenceWriter(target), *size, scale=args.scale)
+        return render_file(args.input, RawRGBWriter(target), *size, scale=args.scale)
+
+    if args.format == "png":
+        n = run(args.output)
+    elif args.output == "-":
+        n = run(sys.stdout.buffer)
+    else:
+        with open(args.output, "wb") as f:
+            n = run(f)
+    print(f"[Offline] {n} frames ({args.width}x{args.height} @ {args.fps}fps)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# ==============================
+# フレーム時間の計測と HUD
+# ==============================
+#
+# 各段の所要時間を perf_counter_ns で測り、確保済みの int64 配列に
+# 直近 PERF_WINDOW 回ぶん貯める。パーセンタイルは HUD の更新時と
+# 定期ダンプの時だけ計算する（計測そのものは配列への代入 1 回）。
+
+import time
+
+import numpy as np
+
+PERF_WINDOW = 600          # 60fps で約 10 秒
+HUD_REFRESH = 15           # HUD の文字を作り直すフレーム間隔
+HUD_FONTS = "consolas,dejavusansmono,monospace"
+PERCENTILES = (50, 95, 99)
+
+STAGES = (
+    ("events", "event pump"),
+    ("analysis", "analysis"),         # 解析スレッドでの analyze() 1 回
+    ("draw", "bar draw"),
+    ("present", "display update"),
+    ("tick", "clock.tick"),
+    ("callback", "audio interval"),
+    ("latency", "capture latency"),   # 最新サンプルの取り込み → そのフレームの画面更新
+)
+
+
+class StageTimer:
+
+    def __init__(self, capacity=PERF_WINDOW):
+        self.samples = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def record(self, ns):
+        self.samples[self.count % len(self.samples)] = ns
+        self.count += 1
+
+    def percentiles(self):
+        # µs 単位の (p50, p95, p99)。まだ記録が無ければ None
+        n = min(self.count, len(self.samples))
+        if n == 0:
+            return None
+        return np.percentile(self.samples[:n], PERCENTILES) / 1e3
+
+
+class IntervalTimer(StageTimer):
+    # 呼ばれた間隔を記録する（オーディオコールバックの到着間隔など）
+
+    def __init__(self, capacity=PERF_WINDOW):
+        super().__init__(capacity)
+        self._last = 0
+
+    def tick(self):
+        now = time.perf_counter_ns()
+        if self._last:
+            self.record(now - self._last)
+        self._last = now
+
+
+class FrameProfiler:
+
+    def __init__(self, capacity=PERF_WINDOW):
+        self.timers = {
+            name: IntervalTimer(capacity) if name == "callback" else StageTimer(capacity)
+            for name, _ in STAGES
+        }
+        self.frames = 0
+        self._started = time.perf_counter()
+
+        # アイドル時間を併せて表示する IdleMonitor（任意）
+        self.idle = None
+
+        # ブロック数・オーバーフローを併せて表示する CaptureTelemetry（任意）
+        self.capture = None
+
+    def __getitem__(self, name):
+        return self.timers[name]
+
+    def summary(self):
+        rows = []
+        for name, label in STAGES:
+            p = self.timers[name].percentiles()
+            if p is not None:
+                rows.append((label, p))
+        return rows
+
+    def fps(self):
+        elapsed = time.perf_counter() - self._started
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def format_lines(self):
+        lines = [f"{self.fps():5.1f} fps   p50 / p95 / p99 (us)"]
+        for label, (p50, p95, p99) in self.summary():
+            lines.append(f"{label:<18}{p50:8.0f}{p95:8.0f}{p99:8.0f}")
+        if self.capture is not None:
+            lines.append(self.capture.format_line())
+        if self.idle is not None:
+            lines.append(self.idle.format_line())
+        return lines
+
+# ==============================
+# 定期ダンプ
+# ==============================
+
+class PerfDumper:
+
+    def __init__(self, profiler, interval):
+        self.profiler = profiler
+        self.interval = interval
+        self._next = time.perf_counter() + interval
+
+    def poll(self):
+        now = time.perf_counter()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+
+        parts = [f"{label} {p50:.0f}/{p95:.0f}/{p99:.0f} us" for label, (p50, p95, p99) in self.profiler.summary()]
+        if self.profiler.capture is not None:
+            parts.append(self.profiler.capture.format_line())
+        if self.profiler.idle is not None:
+            parts.append(self.profiler.idle.format_line())
+        print(f"[Perf] {self.profiler.fps():.1f} fps | " + " | ".join(parts))
+
+# ==============================
+# HUD
+# ==============================
+
+class PerfHUD:
+
+    def __init__(self, profiler, pos=(8, 8), size=14):
+        self.profiler = profiler
+        self.pos = pos
+        self.size = size
+        self.visible = False
+
+        # フォントは初めて表示する時に読む（起動を遅くしない）
+        self._font = None
+        self._text = None
+        self._frame = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._text = None
+
+    def area(self):
+        # HUD が覆う矩形（非表示なら None）
+        if not self.visible or self._text is None:
+            return None
+        return self._text.get_rect(topleft=self.pos)
+
+    def draw(self, surface):
+        # 戻り値：書き換えた矩形（表示していなければ None）
+        if not self.visible:
+            return None
+
+        if self._text is None or self._frame % HUD_REFRESH == 0:
+            self._text = self._render()
+        self._frame += 1
+
+        return surface.blit(self._text, self.pos)
+
+    def _render(self):
+        import pygame
+
+        if self._font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._font = pygame.font.SysFont(HUD_FONTS, self.size)
+
+        lines = self.profiler.format_lines()
+        images = [self._font.render(line, True, (230, 230, 230), (0, 0, 1)) for line in lines]
+
+        # ★ 背景は透過色の黒と少しずらして読めるようにする
+        width = max(img.get_width() for img in images)
+        height = sum(img.get_height() for img in images)
+        text = pygame.Surface((width, height))
+        text.fill((0, 0, 1))
+
+        y = 0
+        for img in images:
+            text.blit(img, (0, y))
+            y += img.get_height()
+
+        return text
@@ -0,0 +1,224 @@
+# ==============================
+# バー描画
+# ==============================
+
+import numpy as np
+import pygame
+
+from visualizer.gradient import GradientLUT
+
+VISUAL_PEAK_INIT = 0.15
+VISUAL_PEAK_DECAY = 0.985
+VISUAL_PEAK_MIN = 0.1
+
+
+class PeakNormalizer:
+    # 直近ピークでバー高さを 0..1 に正規化（ピークはフレームごとに減衰）
+
+    def __init__(self, visual_peak=VISUAL_PEAK_INIT):
+        self.visual_peak = visual_peak
+
+        # 戻り値用の配列（バー数が変わった時だけ作り直す）
+        self._out = np.empty(0)
+
+    def __call__(self, bar_heights):
+        # 戻り値は使い回しの配列（次の呼び出しで上書きされる）
+        current_peak = float(bar_heights.max())
+        self.visual_peak = max(current_peak, self.visual_peak * VISUAL_PEAK_DECAY)
+
+        if self._out.shape != bar_heights.shape:
+            self._out = np.empty(bar_heights.shape)
+
+        # clip(bar_heights / peak, 0, 1)。np.clip は呼び出しごとに小さな確保をするので ufunc で書く
+        np.divide(bar_heights, max(self.visual_peak, VISUAL_PEAK_MIN), out=self._out)
+        np.maximum(self._out, 0, out=self._out)
+        return np.minimum(self._out, 1, out=self._out)
+
+# ==============================
+# 配列ラスタライザ
+# ==============================
+#
+# 全バーの整数高さと色をまとめて計算し、バーごとの縦 1 列ぶんの画像
+# (n_bars + 1, height) を作ってから、列 → バー番号の表で画面幅に展開して
+# 書き込む（描画コストがバー本数に依らない）。
+# 前回描いた整数高さと色の添字を覚えておき、変化したバーの列だけを書き換えて
+# その範囲の矩形を返す（display.update に渡す）。
+# surface は画面のサブサーフェスでもよい（矩形は画面の座標で返す）。
+
+class BarRasterizer:
+
+    def __init__(self, surface, n_bars, bar_width, bar_height, gradient=None, grow_down=False):
+        self.surface = surface
+        self.width, self.height = surface.get_size()
+        self.n_bars = n_bars
+        self.bar_width = bar_width
+        self.bar_height = bar_height
+
+        # grow_down: バーを上端から下へ伸ばす（上下の鏡像表示の下半分）
+        self.grow_down = grow_down
+        self.offset = surface.get_abs_offset()
+
+        # 各列に対応するバー番号。隙間（列幅 bar_width - 2 の残り）は
+        # 背景用の n_bars 番を指す
+        x = np.arange(self.width)
+        bar = x // bar_width
+        inside = (x % bar_width < bar_width - 2) & (bar < n_bars)
+        self.col_bar = np.where(inside, bar, n_bars)
+
+        self.rows = np.arange(self.height)
+        self.background = np.uint32(surface.map_rgb((0, 0, 0)) & 0xFFFFFFFF)
+
+        self._bar_img = np.full((n_bars + 1, self.height), self.background, dtype=np.uint32)
+        self._direct = surface.get_bytesize() in (1, 2, 4)
+
+        self.gradient = gradient or GradientLUT()
+        self._lut = self.gradient.mapped(surface)
+
+        # 前回描いた状態（末尾は隙間用で常に「変化なし」）
+        self._last_h = np.zeros(n_bars, dtype=int)
+        self._last_idx = np.zeros(n_bars, dtype=np.intp)
+        self._changed = np.zeros(n_bars + 1, dtype=bool)
+        self._full = True
+
+        # 上に別のものを描かれた範囲（HUD など）。次の draw で列ごと描き直す
+        self._force_cols = np.zeros(self.width, dtype=bool)
+        self._force_rects = []
+
+    def invalidate(self, rect=None):
+        # 次の draw で描き直す。rect（画面の座標）省略時は全面（ウィンドウの再露出時など）
+        if rect is None:
+            self._full = True
+            return
+
+        rect = rect.move(-self.offset[0], -self.offset[1]).clip(self.surface.get_rect())
+        if rect.width == 0 or rect.height == 0:
+            return
+        self._force_cols[rect.left:rect.right] = True
+        self._force_rects.append(rect.move(self.offset))
+
+    @property
+    def at_rest(self):
+        # 全バーが最低の高さ（1px）まで下がっている
+        return not self._full and not self._force_rects and self._last_h.max() <= 1
+
+    def bar_geometry(self, display_heights):
+        # 各バーの整数高さとグラデーション LUT の添字
+        h = np.maximum(1, (display_heights * self.bar_height).astype(int))
+        return h, self.gradient.index(display_heights)
+
+    def draw(self, display_heights):
+        # 戻り値：書き換えた矩形のリスト（変化が無ければ空）
+        h, color_idx = self.bar_geometry(display_heights)
+
+        changed = self._changed[:self.n_bars]
+        np.not_equal(h, self._last_h, out=changed)
+        changed |= color_idx != self._last_idx
+
+        if not self._full and not self._force_rects and not changed.any():
+            return []
+
+        mapped = self.gradient.lookup(self._lut, color_idx)
+
+        img = self._bar_img[:self.n_bars]
+        img[...] = self.background
+        if self.grow_down:
+            np.copyto(img, mapped[:, None], where=self.rows < h[:, None])
+        else:
+            np.copyto(img, mapped[:, None], where=self.rows >= (self.height - h)[:, None])
+
+        if self._full:
+            self._write_columns(slice(None))
+            rects = [self.surface.get_rect().move(self.offset)]
+            self._full = False
+        else:
+            cols = np.nonzero(self._changed[self.col_bar] | self._force_cols)[0]
+            self._write_columns(cols)
+            rects = self._dirty_rects(np.nonzero(changed)[0], h) + self._force_rects
+
+        self._force_cols[:] = False
+        self._force_rects = []
+
+        self._last_h[:] = h
+        self._last_idx[:] = color_idx
+        return rects
+
+    def _write_columns(self, cols):
+        if self._direct:
+            pixels = pygame.surfarray.pixels2d(self.surface)
+            pixels[cols] = self._bar_img[self.col_bar[cols]]
+            del pixels   # ★ サーフェスのロックを解放
+        else:
+            pygame.surfarray.blit_array(self.surface, self._bar_img[self.col_bar])
+
+    def _dirty_rects(self, bars, h):
+        # 連続した変化バーを 1 つの矩形にまとめる（縦は新旧で高い方の先端から根元まで）
+        reach = np.maximum(h, self._last_h)
+        drawn = max(self.bar_width - 2, 0)
+        ox, oy = self.offset
+
+        rects = []
+        if len(bars) == 0:
+            return rects
+
+        for run in np.split(bars, np.nonzero(np.diff(bars) > 1)[0] + 1):
+            x = int(run[0]) * self.bar_width
+            w = int(run[-1] - run[0]) * self.bar_width + drawn
+            length = min(int(reach[run].max()), self.height)
+            y = 0 if self.grow_down else self.height - length
+            rects.append(pygame.Rect(ox + x, oy + y, w, length))
+
+        return rects
+
+# ==============================
+# 左右の鏡像表示
+# ==============================
+#
+#   mirror : 左半分に L、右半分に R（低域が中央で外側ほど高域。どちらも上向き）
+#   updown : 上半分に L（中央の線から上へ）、下半分に R（中央の線から下へ）
+
+STEREO_LAYOUTS = ("mirror", "updown")
+
+
+class StereoBars:
+    # BarRasterizer と同じく draw / invalidate / at_rest を持つ（高さは (2, n_bars)）
+
+    def __init__(self, surface, n_bars, layout, bar_height, gradient=None):
+        width, height = surface.get_size()
+        self.n_bars = n_bars
+        self.layout = layout
+
+        if layout == "mirror":
+            # L を左右反転して R と 1 本の列に並べ、1 つのラスタライザで描く
+            # （幅の余りは左右に振り分けて中央を画面の中心に合わせる）
+            bar_width = width // (n_bars * 2)
+            used = bar_width * n_bars * 2
+            area = surface.subsurface(((width - used) // 2, 0, used, height))
+            self.rasters = [BarRasterizer(area, n_bars * 2, bar_width, bar_height, gradient)]
+            self._joined = np.empty(n_bars * 2)
+        elif layout == "updown":
+            half = height // 2
+            top = surface.subsurface((0, 0, width, half))
+            bottom = surface.subsurface((0, half, width, height - half))
+            self.rasters = [
+                BarRasterizer(top, n_bars, width // n_bars, bar_height // 2, gradient),
+                BarRasterizer(bottom, n_bars, width // n_bars, bar_height // 2, gradient, grow_down=True),
+            ]
+        else:
+            raise ValueError(f"unknown stereo layout: {layout}")
+
+    def draw(self, display_heights):
+        if self.layout == "mirror":
+            n = self.n_bars
+            self._joined[:n] = display_heights[0, ::-1]
+            self._joined[n:] = display_heights[1]
+            return self.rasters[0].draw(self._joined)
+
+        return self.rasters[0].draw(display_heights[0]) + self.rasters[1].draw(display_heights[1])
+
+    def invalidate(self, rect=None):
+        for raster in self.rasters:
+            raster.invalidate(rect)
+
+    @property
+    def at_rest(self):
+        return all(raster.at_rest for raster in self.rasters)
@@ -0,0 +1,95 @@
+# ==============================
+# 単一生産者 / 単一消費者 リングバッファ
+# ==============================
+#
+# オーディオコールバック（生産者）が書き込み、描画側（消費者）が読む。
+# ロックは使わず、書き込み完了後に write_pos を更新することで公開する。
+# 実体は容量の 2 倍の配列で、各サンプルを i と i + capacity の両方に置く
+# （ミラー）ので、直近 n サンプルは常にコピー無しの連続ビューで取れる。
+
+import numpy as np
+
+
+class RingBuffer:
+    # channels > 1 なら各サンプルは (channels,) の行（latest は (n, channels) のビュー）
+
+    def __init__(self, capacity, dtype=np.float32, channels=1):
+        self.capacity = capacity
+        self.channels = channels
+        self._frames = np.zeros((capacity * 2, channels), dtype=dtype)
+
+        # 1 チャンネルなら 1 次元のビューで扱う（従来どおり）
+        self._data = self._frames[:, 0] if channels == 1 else self._frames
+
+        # これまでに書き込まれた総サンプル数（単調増加）
+        self.write_pos = 0
+
+    def write(self, block, mix=None):
+        # block: (frames,) のモノラル、または (frames, channels)
+        # mix: (入力ch, self.channels) の行列。省略時は平均してモノラル化（1 チャンネルのリングのみ）
+        n = len(block)
+        if n == 0:
+            return
+
+        pos = self.write_pos
+        if n > self.capacity:
+            # 容量を超える分は最新だけ残す（位置はサンプル時刻のまま進める）
+            pos += n - self.capacity
+            block = block[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        start = pos % cap
+        dst = self._data[start:start + n]
+
+        if mix is not None:
+            # ★ チャンネルの選択・ダウンミックスは行列積 1 回で書き込む
+            np.matmul(block, mix, out=self._frames[start:start + n])
+        elif block.ndim == 2 and self.channels == 1:
+            np.sum(block, axis=1, out=dst)
+            np.divide(dst, block.shape[1], out=dst)
+        else:
+            dst[...] = block
+
+        # ミラー側へ複写
+        head = min(n, cap - start)
+        self._data[start + cap:start + cap + head] = dst[:head]
+        if n > head:
+            self._data[:n - head] = self._data[cap:cap + n - head]
+
+        # ★ データを書き終えてから公開
+        self.write_pos = pos + n
+
+    def latest(self, n, end=None):
+        # end（総サンプル位置）で終わる n サンプルのビュー（既定は最新）
+        if n > self.capacity:
+            raise ValueError("n exceeds ring capacity")
+        if end is None:
+            end = self.write_pos
+
+        e = end % self.capacity + self.capacity
+        return self._data[e - n:e]
+
+    def channel(self, index):
+        # 1 チャンネルぶんを RingBuffer と同じ読み方で見る（チャンネルごとの解析用）
+        if self.channels == 1 and index == 0:
+            return self
+        return ChannelView(self, index)
+
+
+class ChannelView:
+    # 多チャンネルのリングの 1 列（読み出し専用）。窓は列の飛び飛びのビューになる
+
+    def __init__(self, ring, index):
+        if not 0 <= index < ring.channels:
+            raise ValueError(f"channel {index} out of range ({ring.channels} channels)")
+        self.ring = ring
+        self.index = index
+        self.capacity = ring.capacity
+
+    @property
+    def write_pos(self):
+        return self.ring.write_pos
+
+    def latest(self, n, end=None):
+        return self.ring.latest(n, end)[:, self.index]
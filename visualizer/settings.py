@@ -0,0 +1,13 @@
+# ==============================
+# ビジュアライザー設定（ライブ / オフライン共通）
+# ==============================
+
+BLOCK_SIZE = 4096   # 解析窓の長さ（周波数分解能）
+HOP_SIZE = 1024     # 解析間隔（遅延はこちらで決まる）
+RING_SIZE = BLOCK_SIZE * 8
+
+N_BARS = 128
+BAR_HEIGHT = 250
+VISUALIZER_HEIGHT = 300
+
+FPS = 60
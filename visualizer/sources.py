@@ -0,0 +1,486 @@
+# ==============================
+# 音声入力ソース
+# ==============================
+#
+# どのソースも (frames, channels) の float32 ブロックを RingBuffer へ書き込む。
+#   device  : sounddevice によるキャプチャ（Voicemeeter Out B1 など）
+#   wav     : WAV ファイル
+#   synth   : 合成信号（tone / sweep / noise / silence）
+#   stdin   : 標準入力からの生 PCM（float32 / int16）
+# デバイス以外は realtime=False で実時間を待たずに流し込める。
+# set_mix でチャンネルの選択・ダウンミックスの行列を指定できる（visualizer.mixing）。
+
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+from visualizer.mixing import mix_matrix
+
+DEFAULT_DEVICE_PATTERN = "Voicemeeter Out B1"
+DEFAULT_BLOCK = 1024
+DEFAULT_DEVICE_BLOCK = 256      # デバイスのブロック（0 はホスト API 任せの可変長）
+DEFAULT_DEVICE_LATENCY = "low"  # PortAudio の入力遅延（"low" / "high" / 秒）
+DEFAULT_DEVICE_MIX = "avg:0,1"
+
+
+class AudioSource:
+
+    def __init__(self, sr, channels, block_size=DEFAULT_BLOCK, realtime=True):
+        self.sr = sr
+        self.channels = channels
+        self.block_size = block_size
+        self.realtime = realtime
+
+        self._thread = None
+        self._stop = threading.Event()
+
+        # ブロック到着ごとに tick() される IntervalTimer（任意）
+        self.callback_timer = None
+
+        # ブロックごとの取り込み時刻・オーバーフローを記録する CaptureTelemetry（任意）
+        self.telemetry = None
+
+        # 入力が届いているか（デバイスのソースは再接続中に False になる）
+        self.connected = True
+
+        # チャンネルのミキシング行列（None なら全チャンネルの平均）
+        self.mix_spec = None
+        self.mix = None
+
+    def set_mix(self, spec):
+        # spec は visualizer.mixing の書式。行列は入力のチャンネル数で作る
+        self.mix_spec = spec
+        self.mix = None if spec is None else mix_matrix(spec, self.channels)
+
+    @property
+    def out_channels(self):
+        # リングに書かれるチャンネル数
+        return 1 if self.mix is None else self.mix.shape[1]
+
+    def blocks(self):
+        # (frames, channels) の float32 ブロックを順に返す（終端で止まる）
+        raise NotImplementedError
+
+    def start(self, ring):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._feed, args=(ring,), name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def finished(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    def _feed(self, ring):
+        t0 = time.perf_counter()
+        pos = 0
+        for block in self.blocks():
+            if self._stop.is_set():
+                break
+            pos += len(block)
+
+            # デバイスと同じく、ブロックの最後のサンプルの時刻が来てから渡す
+            if self.realtime:
+                wait = t0 + pos / self.sr - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+
+            if self.callback_timer is not None:
+                self.callback_timer.tick()
+            ring.write(block, self.mix)
+            if self.telemetry is not None:
+                self.telemetry.record(self.sr, len(block), ring.write_pos)
+
+# ==============================
+# sounddevice キャプチャ
+# ==============================
+
+# 再接続の監視（デバイス消失・ストリームのエラー・コールバックの途絶）
+CAPTURE_POLL_INTERVAL = 0.25   # 監視スレッドが状態を見る間隔（秒）
+CAPTURE_STALL_TIMEOUT = 1.0    # コールバックがこの秒数来なければ止まったとみなす
+RECONNECT_DELAY_MIN = 0.25     # 再接続の試行間隔（失敗するごとに倍、最大 MAX）
+RECONNECT_DELAY_MAX = 2.0
+
+
+def find_input_device(pattern=DEFAULT_DEVICE_PATTERN):
+    import sounddevice as sd
+
+    for i, dev in enumerate(sd.query_devices()):
+        if pattern in dev["name"] and dev["max_input_channels"] > 0:
+            return i
+
+    raise RuntimeError(f"{pattern} not found")
+
+
+def refresh_devices():
+    # PortAudio はデバイス一覧を初期化時にしか読まないので、作り直して読み直す
+    # ★ 開いているストリームはすべて閉じられる（再接続の前にだけ呼ぶ）
+    import sounddevice as sd
+
+    sd._terminate()
+    sd._initialize()
+
+
+class SoundDeviceSource(AudioSource):
+    # ストリームは監視スレッドが見張り、エラー・コールバックの途絶を検出したら
+    # デバイス一覧を読み直して名前で探し直し、ストリームを開き直す。
+    # サンプルレートが変わった場合は sr が更新される（解析側が作り直す）。
+    # channels 省略時はデバイス本来のチャンネル数で開き、set_mix の行列でリングへ書く。
+    # ブロックは小さく（block_size=0 ならホスト API 任せ）、latency="low" で開き、
+    # 解析窓の長さとは関係なくリングへ溜める（窓は StreamingSTFT が hop ごとに取り出す）。
+
+    def __init__(self, pattern=DEFAULT_DEVICE_PATTERN, block_size=DEFAULT_DEVICE_BLOCK, channels=None,
+                 latency=DEFAULT_DEVICE_LATENCY):
+        self.pattern = pattern
+        self.fixed_channels = channels
+        self.latency = latency
+        self._resolve()
+
+        super().__init__(self._device_sr, self._device_channels, block_size)
+
+        # 既定は従来どおり先頭 2ch（L/R）の平均
+        self.set_mix(DEFAULT_DEVICE_MIX if self.channels > 1 else "mono")
+
+        self.stream = None
+        self.ring = None
+
+        # 接続状態（描画ループが見る）と再接続の記録
+        self.connected = False
+        self.reconnects = 0
+        self.last_reacquire = None   # 直近の再接続にかかった秒数
+        self._last_callback = 0.0
+
+    def _resolve(self):
+        import sounddevice as sd
+
+        self.device_index = find_input_device(self.pattern)
+        dev = sd.query_devices(self.device_index)
+        self.name = dev["name"]
+        self._device_sr = int(dev["default_samplerate"])
+        self._device_channels = self.fixed_channels or dev["max_input_channels"]
+
+    def blocks(self):
+        raise NotImplementedError("device capture is callback driven")
+
+    def start(self, ring):
+        self.ring = ring
+        self._open()
+        self.connected = True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._supervise, name="CaptureSupervisor", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        ring = self.ring
+
+        # 行列は開くたびに読む（チャンネル数が変わって作り直した場合も拾う）
+        def audio_callback(indata, frames, time_info, status):
+            self._last_callback = time.perf_counter()
+            if self.callback_timer is not None:
+                self.callback_timer.tick()
+
+            # ★ 確保なしでリングへ直接ダウンミックス（行列積 1 回）
+            if indata is not None and len(indata) > 0:
+                ring.write(indata, self.mix)
+
+            if self.telemetry is not None:
+                overflow = bool(status and status.input_overflow)
+                self.telemetry.record(self.sr, frames, ring.write_pos, time_info, overflow)
+
+        try:
+            self.stream = self._input_stream(audio_callback)
+        except Exception:
+            # 本来のチャンネル数で開けないドライバ向けに 2ch で開き直す
+            if self.fixed_channels or self.channels <= 2:
+                raise
+            print(f"[Capture] {self.channels} ch failed, falling back to 2 ch", flush=True)
+            self.channels = 2
+            self.set_mix(self.mix_spec)
+            self.stream = self._input_stream(audio_callback)
+
+        self._last_callback = time.perf_counter()
+        self.stream.start()
+
+    def _input_stream(self, callback):
+        import sounddevice as sd
+
+        return sd.InputStream(
+            device=self.device_index,
+            samplerate=self.sr,
+            channels=self.channels,
+            callback=callback,
+            blocksize=self.block_size,
+            latency=self.latency,
+            dtype='float32'
+        )
+
+    def _close(self):
+        self.connected = False
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.abort()
+                stream.close()
+            except Exception:
+                pass
+
+    # ==== 監視 ====
+
+    def _failure(self):
+        # 異常の理由（正常なら None）
+        if self.stream is None or not self.stream.active:
+            return "stream stopped"
+
+        stall = max(CAPTURE_STALL_TIMEOUT, 4 * self.block_size / self.sr)   # block_size=0 なら既定の秒数
+        if time.perf_counter() - self._last_callback > stall:
+            return f"no callback for {stall:.1f} s"
+
+        return None
+
+    def _supervise(self):
+        while not self._stop.wait(CAPTURE_POLL_INTERVAL):
+            reason = self._failure()
+            if reason is not None:
+                self._reconnect(reason)
+
+    def _reconnect(self, reason):
+        print(f"[Capture] lost {self.name}: {reason}", flush=True)
+        t0 = time.perf_counter()
+        self._close()
+
+        delay = RECONNECT_DELAY_MIN
+        opened = False
+        while not self._stop.is_set():
+            try:
+                refresh_devices()
+                self._resolve()
+                self.sr = self._device_sr
+                if self._device_channels != self.channels:
+                    self.channels = self._device_channels
+                    self.set_mix(self.mix_spec)
+                self._open()
+                opened = True
+                break
+            except Exception as e:
+                self._close()
+                if delay == RECONNECT_DELAY_MIN:
+                    print(f"[Capture] waiting for {self.pattern}: {e}", flush=True)
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+        if not opened:
+            return
+
+        # ★ 回数を数えてから connected を立てる（描画ループは回数の変化で解析を作り直し、
+        #   それまで途絶前のフレームを読まない）
+        self.reconnects += 1
+        self.last_reacquire = time.perf_counter() - t0
+        self.connected = True
+        print(
+            f"[Capture] reacquired {self.name} @ {self.sr} Hz in {self.last_reacquire * 1000:.0f} ms"
+            f" (reconnect #{self.reconnects})",
+            flush=True
+        )
+
+    def stop(self):
+        super().stop()
+        self._close()
+
+    @property
+    def finished(self):
+        return False
+
+# ==============================
+# WAV ファイル
+# ==============================
+
+def _pcm_to_float32(raw, sampwidth, channels):
+    if sampwidth == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sampwidth == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif sampwidth == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        v = np.where(v >= 1 << 23, v - (1 << 24), v)
+        data = v.astype(np.float32) / (1 << 23)
+    elif sampwidth == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"unsupported sample width: {sampwidth}")
+
+    return data.reshape(-1, channels)
+
+
+class WavFileSource(AudioSource):
+
+    def __init__(self, path, block_size=DEFAULT_BLOCK, realtime=True, loop=False):
+        self.path = path
+        self.loop = loop
+
+        with wave.open(path, "rb") as wf:
+            sr = wf.getframerate()
+            channels = wf.getnchannels()
+            self.n_frames = wf.getnframes()
+
+        super().__init__(sr, channels, block_size, realtime)
+
+    def blocks(self):
+        while True:
+            with wave.open(self.path, "rb") as wf:
+                width = wf.getsampwidth()
+                while True:
+                    raw = wf.readframes(self.block_size)
+                    if not raw:
+                        break
+                    yield _pcm_to_float32(raw, width, self.channels)
+
+            if not self.loop:
+                return
+
+    def read_all(self):
+        # オフライン用：ファイル全体を (frames, channels) で返す
+        with wave.open(self.path, "rb") as wf:
+            raw = wf.readframes(wf.getnframes())
+            return _pcm_to_float32(raw, wf.getsampwidth(), self.channels)
+
+# ==============================
+# 合成信号
+# ==============================
+
+class SyntheticSource(AudioSource):
+
+    KINDS = ("tone", "sweep", "noise", "silence")
+
+    def __init__(self, kind="tone", sr=48000, channels=2, block_size=DEFAULT_BLOCK,
+                 realtime=True, freqs=(440.0,), sweep=(20.0, 20000.0), sweep_period=10.0,
+                 amplitude=0.5, duration=None, seed=0):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown synthetic kind: {kind}")
+
+        super().__init__(sr, channels, block_size, realtime)
+
+        self.kind = kind
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.sweep = sweep
+        self.sweep_period = sweep_period
+        self.amplitude = amplitude
+        self.duration = duration   # 秒（None なら無限）
+        self.seed = seed
+
+    def _signal(self, n, t):
+        # t: 先頭からの経過秒（長さ n）
+        if self.kind == "tone":
+            phase = 2 * np.pi * self.freqs[:, None] * t
+            return np.sin(phase).sum(axis=0) / len(self.freqs)
+
+        if self.kind == "sweep":
+            # 対数スイープ。sweep_period 秒ごとに先頭へ戻る
+            f0, f1 = self.sweep
+            k = np.log(f1 / f0) / self.sweep_period
+            tt = np.mod(t, self.sweep_period)
+            return np.sin(2 * np.pi * f0 * (np.exp(k * tt) - 1) / k)
+
+        if self.kind == "noise":
+            return self._rng.uniform(-1, 1, n)
+
+        return np.zeros(n)
+
+    def blocks(self):
+        self._rng = np.random.default_rng(self.seed)
+        total = None if self.duration is None else int(self.duration * self.sr)
+
+        pos = 0
+        while total is None or pos < total:
+            n = self.block_size if total is None else min(self.block_size, total - pos)
+            t = (pos + np.arange(n)) / self.sr
+
+            mono = (self.amplitude * self._signal(n, t)).astype(np.float32)
+            yield np.repeat(mono[:, None], self.channels, axis=1)
+
+            pos += n
+
+# ==============================
+# 標準入力 PCM
+# ==============================
+
+PCM_FORMATS = {
+    "float32": (np.dtype("<f4"), 1.0),
+    "int16": (np.dtype("<i2"), 1 / 32768),
+}
+
+
+class StdinPCMSource(AudioSource):
+
+    def __init__(self, fmt="float32", sr=48000, channels=2, block_size=DEFAULT_BLOCK,
+                 realtime=False, stream=None):
+        if fmt not in PCM_FORMATS:
+            raise ValueError(f"unsupported PCM format: {fmt}")
+
+        super().__init__(sr, channels, block_size, realtime)
+
+        self.dtype, self.scale = PCM_FORMATS[fmt]
+        self.stream = stream if stream is not None else sys.stdin.buffer
+
+    def blocks(self):
+        frame_bytes = self.dtype.itemsize * self.channels
+        raw = bytearray(self.block_size * frame_bytes)
+        view = memoryview(raw)
+
+        while True:
+            # パイプは要求より短く返ることがあるので埋まるまで読む
+            got = 0
+            while got < len(raw):
+                n = self.stream.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+
+            got -= got % frame_bytes
+            if got == 0:
+                return
+
+            data = np.frombuffer(raw, dtype=self.dtype, count=got // self.dtype.itemsize)
+            yield (data.astype(np.float32) * self.scale).reshape(-1, self.channels)
+
+            if got < len(raw):
+                return
+
+# ==============================
+# ソース指定文字列
+# ==============================
+#
+#   device[:名前の一部]      例) device:Voicemeeter Out B1
+#   wav:パス
+#   synth:tone|sweep|noise|silence
+#   stdin[:float32|int16]
+
+def open_source(spec, block_size=DEFAULT_BLOCK, realtime=True, sr=48000, channels=2, device_channels=None,
+                latency=DEFAULT_DEVICE_LATENCY):
+    # device_channels: デバイスを開くチャンネル数（省略時はデバイス本来の数）
+    # block_size=0 はデバイスならホスト API 任せ、それ以外は DEFAULT_BLOCK
+    kind, _, arg = spec.partition(":")
+
+    if kind == "device":
+        return SoundDeviceSource(arg or DEFAULT_DEVICE_PATTERN, block_size, device_channels, latency)
+
+    block_size = block_size or DEFAULT_BLOCK
+    if kind == "wav":
+        return WavFileSource(arg, block_size, realtime)
+    if kind == "synth":
+        return SyntheticSource(arg or "tone", sr, channels, block_size, realtime)
+    if kind == "stdin":
+        return StdinPCMSource(arg or "float32", sr, channels, block_size, realtime)
+
+    raise ValueError(f"unknown audio source: {spec}")
@@ -0,0 +1,326 @@
+# ==============================
+# スペクトル → バー高さ 変換エンジン
+# ==============================
+
+from functools import lru_cache
+
+import numpy as np
+
+from visualizer.filterbank import create_custom_log_bins, get_filterbank
+from visualizer.settings import HOP_SIZE
+
+NOISE_FLOOR_DB = -65
+GATE_MARGIN_DB = 8
+
+# 時間スムージング係数は 60 Hz で更新した時の値（元は描画フレームごとに掛けていた）。
+# 実際の更新は hop ごとなので、プランを作る時に SR / hop の更新頻度へ換算する
+SMOOTH_LOW = 0.18
+SMOOTH_HIGH = 0.03
+SMOOTH_RATE = 60
+
+EXP_LOW = 1.6
+EXP_HIGH = 3.2
+
+GAIN_LOW = 1.0
+GAIN_HIGH = 2.2
+
+LOW_BOOST_MAX = 1.5
+LOW_BOOST_END = 0.35
+
+# 横スムージング（低域）を掛ける本数
+LOW_SMOOTH_BARS = 12
+
+LOG1P_8 = np.log1p(8)
+
+# ==============================
+# 時間スムージング
+# ==============================
+
+def smooth_coefficient(coef, rate):
+    # SMOOTH_RATE（Hz）ごとの係数 → 毎秒 rate 回更新した時に同じ時定数になる係数
+    return 1 - (1 - coef) ** (SMOOTH_RATE / rate)
+
+# ==============================
+# 横スムージング
+# ==============================
+
+def _low_smooth_matrix(n_bars):
+    # 低域の横スムージングは前のバーの「更新後の値」を使う漸化式なので、
+    # 単位行列に同じ式を適用して 1 回の行列積に畳み込む
+    n = min(LOW_SMOOTH_BARS, n_bars - 1)
+    m = np.eye(n + 1)
+    for i in range(1, n):
+        m[i] = m[i - 1] * 0.25 + m[i] * 0.5 + m[i + 1] * 0.25
+    return m[:n]
+
+# ==============================
+# バンド集約
+# ==============================
+
+class BandEngine:
+
+    # rate: 時間スムージングの更新頻度（毎秒の回数 = SR / hop）
+
+    def __init__(self, log_bins, freqs, filterbank=None, rate=SMOOTH_RATE):
+        self.n_bars = len(log_bins) - 1
+        self.n_freqs = len(freqs)
+
+        # freqs は昇順なので各バーのマスクは連続区間 [start, start + count)
+        edges = np.searchsorted(freqs, log_bins, side="left")
+        self.starts = edges[:-1]
+        self.counts = np.diff(edges)
+        self.has_bins = self.counts > 0
+        self.end = int(edges[-1])
+
+        # reduceat 用：末尾に 0 を 1 つ足して空区間でも添字が範囲内に収まるようにする
+        self._reduce_idx = np.minimum(self.starts, self.end)
+        self._safe_counts = np.maximum(self.counts, 1)
+        self._no_bins = ~self.has_bins
+
+        # バー位置 t に依存する係数（★ 毎フレーム同じなので前計算）
+        t = np.arange(self.n_bars) / (self.n_bars - 1)
+        self.exp = EXP_LOW * (1 - t) + EXP_HIGH * t
+        self.gain = GAIN_LOW * (1 - t) + GAIN_HIGH * t
+        self.low_boost = np.where(
+            t < LOW_BOOST_END,
+            1 + (1 - t / LOW_BOOST_END) * (LOW_BOOST_MAX - 1),
+            1.0
+        )
+        self.smooth_coef = smooth_coefficient(SMOOTH_LOW * (1 - t) + SMOOTH_HIGH * t, rate)
+
+        self.low_smooth = _low_smooth_matrix(self.n_bars)
+        self._low_smooth_t = np.ascontiguousarray(self.low_smooth.T)
+
+        # 三角フィルタバンク（None なら log_bins の矩形バンド）
+        self.filterbank = filterbank
+
+    def band_power(self, fft, work=None):
+        # 各バーの RMS（ビンが無いバーは 1e-9）。先頭次元はバッチとして扱う
+        # 戻り値は work.power（work 省略時はその場で確保）
+        if work is None:
+            work = BandWork(self, fft.shape[:-1], sparse=False)
+
+        if self.filterbank is not None:
+            return self.filterbank.apply(fft, work.power, work.gather)
+
+        np.square(fft[..., :self.end], out=work.sq[..., :self.end])
+        np.add.reduceat(work.sq, self._reduce_idx, axis=-1, out=work.power)
+        np.divide(work.power, self._safe_counts, out=work.power)
+        np.sqrt(work.power, out=work.power)
+        np.copyto(work.power, 1e-9, where=self._no_bins)
+        return work.power
+
+    def shape(self, fft, work=None):
+        # ゲート・カーブ・ゲイン・低域ブーストまで（時間方向の状態を持たない部分）
+        if work is None:
+            work = BandWork(self, fft.shape[:-1], sparse=False)
+        return self.curve(self.band_power(fft, work), work)
+
+    def curve(self, power, work=None):
+        # バーごとの RMS → 表示前の高さ（戻り値は work.raw）
+        if work is None:
+            work = BandWork(self, power.shape[:-1])
+        db, raw = work.tmp, work.raw
+
+        # db = 20 * log10(power + 1e-9) - NOISE_FLOOR_DB
+        np.add(power, 1e-9, out=db)
+        np.log10(db, out=db)
+        np.multiply(db, 20, out=db)
+        np.subtract(db, NOISE_FLOOR_DB, out=db)
+        np.less_equal(db, GATE_MARGIN_DB, out=work.gate)
+
+        # raw = (log1p(clip(db / |floor|) * 8) / log1p(8)) ** exp * gain * low_boost
+        np.divide(db, abs(NOISE_FLOOR_DB), out=raw)
+        np.maximum(raw, 0, out=raw)   # clip(0, 1)（np.clip は呼び出しごとに小さな確保をする）
+        np.minimum(raw, 1, out=raw)
+        np.multiply(raw, 8, out=raw)
+        np.log1p(raw, out=raw)
+        np.divide(raw, LOG1P_8, out=raw)
+        np.power(raw, self.exp, out=raw)
+        np.multiply(raw, self.gain, out=raw)
+        np.multiply(raw, self.low_boost, out=raw)
+        np.copyto(raw, 0.0, where=work.gate)
+
+        return raw
+
+    def smooth(self, raw, prev_bar_heights, coef=None, out=None, work=None):
+        # coef: 時間スムージング係数（省略時はプランの hop ごとに更新する前提の値）
+        # out に prev_bar_heights を渡すとその場で更新する
+        # 先頭次元はチャンネルとして扱う（各行が独立した 1 フレーム）
+        if coef is None:
+            coef = self.smooth_coef
+        if out is None:
+            out = np.empty_like(prev_bar_heights)
+        if work is None:
+            work = BandWork(self, prev_bar_heights.shape[:-1])
+        keep = work.smooth_tmp
+
+        # out = prev * (1 - coef) + raw * coef
+        np.subtract(1, coef, out=keep)
+        np.multiply(prev_bar_heights, keep, out=out)
+        np.multiply(raw, coef, out=keep)
+        np.add(out, keep, out=out)
+
+        # 横スムージング（低域）
+        n = len(self.low_smooth)
+        np.matmul(out[..., :n + 1], self._low_smooth_t, out=work.low)
+        out[..., :n] = work.low
+
+        return out
+
+    def process(self, fft, prev_bar_heights, out=None, work=None):
+        if work is None:
+            work = BandWork(self, fft.shape[:-1])
+        return self.smooth(self.shape(fft, work), prev_bar_heights, out=out, work=work)
+
+
+class BandWork:
+    # BandEngine の作業用配列（1 フレームなら shape=()、バッチなら (n_frames,)、
+    # 複数チャンネルを同時に解析するなら (channels,)）
+    # ★ ライブ解析では使い回して毎フレームの確保を無くす
+
+    def __init__(self, bands, shape=(), sparse=True):
+        # sparse=False: フィルタバンクを帯行列との行列積で掛ける（大きなバッチ向け）
+        shape = tuple(shape)
+        n = bands.n_bars
+
+        # 末尾の 1 要素は reduceat 用に常に 0
+        self.sq = np.zeros(shape + (bands.end + 1,))
+        self.power = np.empty(shape + (n,))
+        self.tmp = np.empty(shape + (n,))
+        self.raw = np.empty(shape + (n,))
+        self.gate = np.empty(shape + (n,), dtype=bool)
+
+        self.smooth_tmp = np.empty(shape + (n,))
+        self.low = np.empty(shape + (len(bands.low_smooth),))
+
+        fb = bands.filterbank
+        self.gather = None if fb is None or not sparse else np.empty(shape + (len(fb.cols),))
+
+# ==============================
+# スペクトルプラン（窓・周波数軸・バー係数のキャッシュ）
+# ==============================
+
+# ブロック長やサンプルレートが切り替わっても作り直さずに済むよう数個だけ保持
+PLAN_CACHE_SIZE = 4
+
+
+class SpectrumPlan:
+    # scale: None なら矩形バンド、"mel" / "bark" / "erb" / "log" なら三角フィルタバンク
+    # band_sr: バーの並びを決める SR（省略時は sr。間引いた信号の解析用）
+    # hop: 解析間隔（band_sr のサンプル数）。時間スムージングの係数をこれで換算する
+
+    def __init__(self, n_fft, sr, n_bars, scale=None, band_sr=None, hop=HOP_SIZE):
+        self.n_fft = n_fft
+        self.sr = sr
+        self.n_bars = n_bars
+        self.scale = scale
+        self.hop = hop
+        rate = (band_sr or sr) / hop
+
+        self.window = np.hanning(n_fft)
+        self.freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+
+        if scale is None:
+            self.log_bins = create_custom_log_bins(band_sr or sr, n_bars)
+            self.bands = BandEngine(self.log_bins, self.freqs, rate=rate)
+        else:
+            filterbank = get_filterbank(scale, n_bars, n_fft, sr, band_sr)
+            self.log_bins = filterbank.edges
+            self.bands = BandEngine(self.log_bins, self.freqs, filterbank, rate)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def get_plan(n_fft, sr, n_bars, scale=None, band_sr=None, hop=HOP_SIZE):
+    return SpectrumPlan(n_fft, sr, n_bars, scale, band_sr, hop)
+
+# ==============================
+# アナライザ
+# ==============================
+
+# numpy 2.0 以降は rfft に out を渡せる（それより前は結果を写す）
+_RFFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+def rfft_into(x, out):
+    if _RFFT_OUT:
+        return np.fft.rfft(x, out=out)
+    out[...] = np.fft.rfft(x)
+    return out
+
+
+class AnalysisWork:
+    # 窓長 1 つぶんの作業用配列（窓掛け・FFT・振幅・バンド集約）
+    # channels > 1 なら (channels, n_fft) にまとめて 1 回の rfft で解析する
+
+    def __init__(self, plan, channels=1):
+        shape = (channels,) if channels > 1 else ()
+        self.windowed = np.empty(shape + (plan.n_fft,))
+
+        # 窓関数も同じ形で持つ（放送して掛けると ufunc が一時バッファを作る）
+        self.window = np.tile(plan.window, shape + (1,)) if shape else plan.window
+        self.spec = np.empty(shape + (plan.n_fft // 2 + 1,), dtype=complex)
+        self.mag = np.empty(shape + (plan.n_fft // 2 + 1,))
+        self.bands = BandWork(plan.bands, shape)
+
+    def magnitude(self, audio, plan):
+        # audio: (n_fft,)、または (n_fft, channels)（多チャンネルのリングの窓）
+        # float32 × float64 を直接掛けると型変換の一時バッファが作られるので先に写す
+        np.copyto(self.windowed, audio.T)
+        np.multiply(self.windowed, self.window, out=self.windowed)
+        rfft_into(self.windowed, self.spec)
+        return np.abs(self.spec, out=self.mag)
+
+
+class SpectrumAnalyzer:
+    # channels > 1 なら analyze は (n_fft, channels) の窓を受け取り、
+    # (channels, n_bars) の高さを返す（rfft もバンド集約も全チャンネルで 1 回）
+
+    # hop: analyze を呼ぶ間隔（サンプル数）。時間スムージングの係数はこれで決まる
+
+    def __init__(self, sr, n_bars, scale=None, channels=1, hop=HOP_SIZE):
+        self.sr = sr
+        self.n_bars = n_bars
+        self.scale = scale
+        self.channels = channels
+        self.hop = hop
+        self.prev_bar_heights = np.zeros((channels, n_bars) if channels > 1 else n_bars)
+
+        # プランごとの作業用配列（定常状態では毎フレームの確保が無い）
+        self._work = {}
+
+    def work(self, plan):
+        work = self._work.get(plan.n_fft)
+        if work is None:
+            work = self._work[plan.n_fft] = AnalysisWork(plan, self.channels)
+        return work
+
+    def analyze(self, audio):
+        # 戻り値は prev_bar_heights そのもの（次の analyze で上書きされる）
+        if audio is None or len(audio) == 0:
+            return self.prev_bar_heights
+
+        plan = get_plan(len(audio), self.sr, self.n_bars, self.scale, hop=self.hop)
+        work = self.work(plan)
+
+        fft = work.magnitude(audio, plan)
+        return plan.bands.process(fft, self.prev_bar_heights, out=self.prev_bar_heights, work=work.bands)
+
+    def analyze_batch(self, frames):
+        # frames: (n_frames, n_fft)。2-D rfft を 1 回で行い、時間方向の
+        # スムージングだけを 1 フレームずつ進める（analyze を順に呼ぶのと同じ結果）
+        if len(frames) == 0:
+            return np.empty((0, self.n_bars))
+
+        plan = get_plan(frames.shape[1], self.sr, self.n_bars, self.scale, hop=self.hop)
+
+        fft = np.abs(np.fft.rfft(frames * plan.window, axis=1))
+        raw = plan.bands.shape(fft)
+
+        out = np.empty_like(raw)
+        work = BandWork(plan.bands)
+        for k in range(len(raw)):
+            plan.bands.smooth(raw[k], self.prev_bar_heights, out=self.prev_bar_heights, work=work)
+            out[k] = self.prev_bar_heights
+
+        return out
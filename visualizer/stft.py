@@ -0,0 +1,37 @@
+# ==============================
+# 重ね合わせ窓のストリーミング STFT
+# ==============================
+
+class StreamingSTFT:
+
+    def __init__(self, ring, window_size, hop_size):
+        if hop_size <= 0 or hop_size > window_size:
+            raise ValueError("hop_size must be in 1..window_size")
+        if window_size > ring.capacity:
+            raise ValueError("window_size exceeds ring capacity")
+
+        self.ring = ring
+        self.window_size = window_size
+        self.hop_size = hop_size
+
+        # 次に解析する窓の終端（リングの総サンプル位置）
+        self._next_end = ring.write_pos + hop_size
+
+        # 直前に返した窓の終端（解析スレッドが取り込み時刻を引く）
+        self.end = ring.write_pos
+
+    def frames(self):
+        # 前回以降に進んだ hop ごとに、直近 window_size サンプルの窓を返す
+        # ★ 返すのはリングのビューなので次の窓までに使い切ること
+        end = self.ring.write_pos
+
+        # 生産者に上書きされうる古い位置は飛ばす（hop の格子は保つ）
+        oldest = end - (self.ring.capacity - self.window_size)
+        if self._next_end < oldest:
+            behind = oldest - self._next_end
+            self._next_end += -(-behind // self.hop_size) * self.hop_size
+
+        while self._next_end <= end:
+            self.end = self._next_end
+            yield self.ring.latest(self.window_size, self._next_end)
+            self._next_end += self.hop_size
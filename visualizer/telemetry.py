@@ -0,0 +1,82 @@
+# ==============================
+# キャプチャのテレメトリ
+# ==============================
+#
+# オーディオコールバックごとに ADC 時刻・コールバック時刻・フレーム数・
+# オーバーフローを確保済みの配列へ直近 TELEMETRY_WINDOW 回ぶん記録する
+# （コールバック内では配列への代入だけ）。
+# PortAudio の時刻はストリームの時計なので、「コールバック時刻 − ADC 時刻」の遅れを
+# perf_counter から引いて、ブロックの最新サンプルが取り込まれた時刻に直して持つ。
+# 解析スレッドは窓の終端（リングの総サンプル位置）からこの時刻を引き、
+# 描画ループは画面に出した時刻との差を capture-to-present の遅延として記録する。
+
+import time
+
+import numpy as np
+
+TELEMETRY_WINDOW = 1024
+
+
+class CaptureTelemetry:
+
+    def __init__(self, capacity=TELEMETRY_WINDOW):
+        self.adc = np.zeros(capacity)          # 先頭サンプルの ADC 時刻（ストリームの時計、不明なら 0）
+        self.callback = np.zeros(capacity)     # コールバック時刻（ストリームの時計、不明なら 0）
+        self.arrival = np.zeros(capacity)      # コールバック時刻（perf_counter）
+        self.captured = np.zeros(capacity)     # 最新サンプルの取り込み時刻（perf_counter）
+        self.frames = np.zeros(capacity, dtype=np.int64)
+        self.end_pos = np.zeros(capacity, dtype=np.int64)   # 書き込み後のリングの総サンプル位置
+        self.overflow = np.zeros(capacity, dtype=bool)
+
+        # 累計（配列は直近ぶんだけ）
+        self.count = 0
+        self.total_frames = 0
+        self.overflows = 0
+
+    def record(self, sr, frames, end_pos, time_info=None, overflow=False):
+        # time_info: sounddevice のコールバックの time_info（無ければ書き込んだ時刻を取り込み時刻とする）
+        now = time.perf_counter()
+        adc = callback = 0.0
+        captured = now
+        if time_info is not None:
+            adc = time_info.inputBufferAdcTime
+            callback = time_info.currentTime
+
+            # ADC 時刻を返さないホスト API（MME など）は 0 になる
+            if adc > 0 and callback >= adc:
+                captured = now - (callback - adc) + (frames - 1) / sr
+
+        i = self.count % len(self.frames)
+        self.adc[i] = adc
+        self.callback[i] = callback
+        self.arrival[i] = now
+        self.captured[i] = captured
+        self.frames[i] = frames
+        self.end_pos[i] = end_pos
+        self.overflow[i] = overflow
+
+        self.total_frames += frames
+        self.overflows += overflow
+        # ★ 書き終えてから公開（読み手は count から最新の行を選ぶ）
+        self.count += 1
+
+    def capture_time(self, pos, sr):
+        # リングの位置 pos の直前のサンプルが取り込まれた時刻（perf_counter、まだ記録が無ければ 0）
+        # 最新のブロックから SR で外挿する（読み手の直後に書かれた行を避けるため count を先に読む）
+        count = self.count
+        if count == 0:
+            return 0.0
+        i = (count - 1) % len(self.frames)
+        return self.captured[i] - (self.end_pos[i] - pos) / sr
+
+    def block_sizes(self):
+        # 直近のブロックのフレーム数 (最小, 最大)
+        n = min(self.count, len(self.frames))
+        if n == 0:
+            return 0, 0
+        return int(self.frames[:n].min()), int(self.frames[:n].max())
+
+    def format_line(self):
+        lo, hi = self.block_sizes()
+        frames = f"{lo}" if lo == hi else f"{lo}-{hi}"
+        return f"capture {self.count} blocks x {frames} frames / {self.overflows} overflows"
@@ -0,0 +1,240 @@
+# ==============================
+# オーバーレイウィンドウのバックエンド
+# ==============================
+#
+#   win32 : 透過・最前面・クリック透過のオーバーレイ（従来の動作）
+#   sdl   : pygame だけで開く枠なしウィンドウ（Linux / macOS）
+#   none  : 画面を持たない（SDL の dummy ドライバ。計測・サーバー用）
+# どのバックエンドも作業領域の下端にウィンドウを置く。
+
+import ctypes
+import os
+import sys
+from ctypes import Structure, byref, c_long
+
+HEADLESS_SIZE = (1920, 1080)
+
+
+class WindowBackend:
+
+    name = None
+
+    def __init__(self):
+        self.surface = None
+
+    def work_area(self):
+        # (x, y, width, height)。display.init() の後に呼ばれる
+        raise NotImplementedError
+
+    def open(self, height):
+        import pygame
+
+        self.prepare()
+        pygame.display.init()
+
+        x, y, width, area_height = self.work_area()
+        os.environ["SDL_VIDEO_WINDOW_POS"] = f"{x},{y + area_height - height}"
+
+        self.surface = pygame.display.set_mode((width, height), self.flags(pygame))
+        pygame.display.set_caption("Visualizer")
+
+        self.setup()
+        return self.surface
+
+    def prepare(self):
+        # display.init() の前に環境変数などを整える
+        pass
+
+    def flags(self, pygame):
+        return pygame.NOFRAME
+
+    def setup(self):
+        # ウィンドウを開いた直後の設定（最前面・クリック透過など）
+        self.keep_topmost()
+        self.set_click_through(True)
+
+    def keep_topmost(self):
+        # フォーカスを失った時に呼ばれる
+        pass
+
+    def set_click_through(self, enabled):
+        pass
+
+# ==============================
+# Win32
+# ==============================
+
+class RECT(Structure):
+    _fields_ = [
+        ("left", c_long),
+        ("top", c_long),
+        ("right", c_long),
+        ("bottom", c_long)
+    ]
+
+
+SPI_GETWORKAREA = 0x0030
+
+GWL_EXSTYLE = -20
+WS_EX_LAYERED = 0x00080000
+WS_EX_TRANSPARENT = 0x00000020
+WS_EX_TOPMOST = 0x00000008
+
+LWA_COLORKEY = 0x00000001
+
+HWND_TOPMOST = -1
+SWP_NOMOVE = 0x0002
+SWP_NOSIZE = 0x0001
+SWP_NOACTIVATE = 0x0010
+SWP_SHOWWINDOW = 0x0040
+
+
+class Win32Backend(WindowBackend):
+
+    name = "win32"
+
+    def __init__(self):
+        super().__init__()
+        self.user32 = ctypes.windll.user32
+        self.hwnd = None
+
+    def work_area(self):
+        # プライマリモニタの作業領域（タスクバーを除く）
+        # ★ ダミーウィンドウを開かずに取得する
+        rc = RECT()
+        self.user32.SystemParametersInfoW(SPI_GETWORKAREA, 0, byref(rc), 0)
+        return rc.left, rc.top, rc.right - rc.left, rc.bottom - rc.top
+
+    def flags(self, pygame):
+        return pygame.NOFRAME | pygame.SRCALPHA
+
+    def setup(self):
+        import pygame
+
+        self.hwnd = pygame.display.get_wm_info()["window"]
+
+        # ==== 透過・最前面設定 ====
+        ex_style = self.user32.GetWindowLongW(self.hwnd, GWL_EXSTYLE)
+        self.user32.SetWindowLongW(
+            self.hwnd,
+            GWL_EXSTYLE,
+            ex_style | WS_EX_LAYERED | WS_EX_TOPMOST
+        )
+
+        # 黒を透過色に
+        self.user32.SetLayeredWindowAttributes(self.hwnd, 0x000000, 0, LWA_COLORKEY)
+
+        self.user32.SetWindowPos(
+            self.hwnd,
+            HWND_TOPMOST,
+            0, 0, 0, 0,
+            SWP_NOMOVE | SWP_NOSIZE | SWP_SHOWWINDOW
+        )
+
+        # クリック透過は最後に追加
+        self.set_click_through(True)
+
+    def keep_topmost(self):
+        self.user32.SetWindowPos(
+            self.hwnd,
+            HWND_TOPMOST,
+            0, 0, 0, 0,
+            SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE
+        )
+
+    def set_click_through(self, enabled):
+        ex_style = self.user32.GetWindowLongW(self.hwnd, GWL_EXSTYLE)
+        if enabled:
+            ex_style |= WS_EX_TRANSPARENT
+        else:
+            ex_style &= ~WS_EX_TRANSPARENT
+        self.user32.SetWindowLongW(self.hwnd, GWL_EXSTYLE, ex_style)
+
+# ==============================
+# SDL（pygame のみ）
+# ==============================
+#
+# SDL2 には色キー透過とクリック透過の移植可能な API が無いので、
+# 黒背景の枠なしウィンドウになる。最前面は pygame が対応していれば使う。
+
+class SDLBackend(WindowBackend):
+
+    name = "sdl"
+
+    def __init__(self):
+        super().__init__()
+        self.window = None
+
+    def work_area(self):
+        import pygame
+
+        width, height = pygame.display.get_desktop_sizes()[0]
+        return 0, 0, width, height
+
+    def setup(self):
+        try:
+            from pygame._sdl2.video import Window
+            self.window = Window.from_display_module()
+        except Exception:
+            self.window = None
+
+        self.keep_topmost()
+        self.set_click_through(True)
+
+    def keep_topmost(self):
+        # pygame-ce などは Window.always_on_top を持つ
+        if self.window is not None and hasattr(type(self.window), "always_on_top"):
+            self.window.always_on_top = True
+
+    def set_click_through(self, enabled):
+        if enabled:
+            print("[Window] click-through is not supported by the sdl backend")
+
+# ==============================
+# 画面なし
+# ==============================
+
+class HeadlessBackend(WindowBackend):
+
+    name = "none"
+
+    def __init__(self, size=HEADLESS_SIZE):
+        super().__init__()
+        self.size = size
+
+    def prepare(self):
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    def work_area(self):
+        return (0, 0) + tuple(self.size)
+
+    def setup(self):
+        pass
+
+# ==============================
+# 選択
+# ==============================
+
+BACKENDS = {
+    "win32": Win32Backend,
+    "sdl": SDLBackend,
+    "none": HeadlessBackend,
+}
+
+
+def default_backend():
+    if os.environ.get("SDL_VIDEODRIVER") == "dummy":
+        return "none"
+    if sys.platform == "win32":
+        return "win32"
+    if sys.platform == "darwin" or os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"):
+        return "sdl"
+    return "none"
+
+
+def open_backend(name="auto"):
+    if name == "auto":
+        name = default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"unknown window backend: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,95 @@
+# ==============================
+# 解析スレッド
+# ==============================
+#
+# リングから hop ごとに窓を取り出して解析し、結果を FrameSlot に置く。
+# 描画ループは最新のフレームだけを読む（古いフレームは捨てる＝キューが伸びない）。
+
+import threading
+import time
+
+import numpy as np
+
+
+class FrameSlot:
+    # 二重バッファ。書き手は裏面に書いてから表裏を入れ替え、
+    # 読み手は表面を自分の配列へ写す（入れ替えと写しの間だけロック）
+    # shape: 1 フレームの形（n_bars、または複数チャンネルなら (channels, n_bars)）
+
+    def __init__(self, shape):
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self._buffers = np.zeros((2,) + shape)
+        self._stamps = [0.0, 0.0]
+        self._front = 0
+        self._lock = threading.Lock()
+
+        # 公開したフレーム数（読み手が更新の有無を判定する）
+        self.seq = 0
+
+        # 直前に read したフレームの最新サンプルの取り込み時刻（perf_counter、不明なら 0）
+        self.stamp = 0.0
+
+    def publish(self, bar_heights, stamp=0.0):
+        back = 1 - self._front
+        self._buffers[back] = bar_heights
+        self._stamps[back] = stamp
+
+        with self._lock:
+            self._front = back
+            self.seq += 1
+
+    def read(self, out):
+        with self._lock:
+            out[:] = self._buffers[self._front]
+            self.stamp = self._stamps[self._front]
+            return self.seq
+
+
+class AnalysisWorker(threading.Thread):
+
+    def __init__(self, stft, analyzer, poll_interval=None, timer=None, idle=None, telemetry=None):
+        super().__init__(name="AnalysisWorker", daemon=True)
+
+        self.stft = stft
+        self.analyzer = analyzer
+        self.slot = FrameSlot(analyzer.prev_bar_heights.shape)
+
+        # 新しい hop を待つ間隔（既定は hop 長の半分）
+        self.poll_interval = poll_interval or stft.hop_size / analyzer.sr / 2
+
+        # 解析 1 回ぶんの所要時間を記録する StageTimer（任意）
+        self.timer = timer
+
+        # 無音ゲート（IdleMonitor、任意）。アイドル中の無音は解析しない
+        self.idle = idle
+
+        # 窓の終端の取り込み時刻をフレームに付ける CaptureTelemetry（任意）
+        self.telemetry = telemetry
+
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            if self.idle is not None and not self.idle.update() and self.idle.idle:
+                # hop の位置だけ進めて FFT は飛ばす
+                for _ in self.stft.frames():
+                    pass
+                self._stopping.wait(self.poll_interval)
+                continue
+
+            for window in self.stft.frames():
+                t0 = time.perf_counter_ns()
+                bar_heights = self.analyzer.analyze(window)
+                if self.timer is not None:
+                    self.timer.record(time.perf_counter_ns() - t0)
+
+                stamp = 0.0
+                if self.telemetry is not None:
+                    stamp = self.telemetry.capture_time(self.stft.end, self.analyzer.sr)
+                self.slot.publish(bar_heights, stamp)
+
+            self._stopping.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopping.set()
+        self.join()